@@ -1,419 +1,589 @@
+import time
+from functools import wraps
 import streamlit as st
-import mysql.connector
 import pandas as pd
 import plotly.express as px
 
-# ================= DATABASE CONNECTION =================
-def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="kishan21",
-        database="phonepe_pulse"
-    )
+from db import QueryCache, export_table, get_cubes, run_named, top_entities
+from instrument import span, start_collection, collected, enabled, configure_logging
+
+# ================= Instrumentation =================
+# PULSE_TRACE=1 traces every session; ?debug=1 in the URL traces this one
+configure_logging()
+start_collection(force=st.query_params.get("debug") == "1")
+# marks a full script run, as opposed to a rerun of one section (see section())
+st.session_state["page_run_started"] = time.perf_counter()
 
 # ================= Sidebar Navigation =================
 st.sidebar.title("Navigation")
 page = st.sidebar.selectbox("Select a page:", ["Home", "Analysis"])
 import streamlit as st
 import pandas as pd
-import pydeck as pdk
-import requests
+
+from deckmap import LAYER_ID, ChoroplethTemplate, district_template
+from export import EXPORT_TABLES, EXPORT_URL, FORMATS
+from geo import (STATE_KEY, district_index, district_tolerance, fit_view, load_district_geometry, load_state_geometry,
+                 match_key, match_state)
+from rollups import LEADERBOARD_SOURCES
+
+# Home page data types: (state-level table, all-India table, value column, count column) in the cubes
+HOME_SOURCES = {
+    "Transaction": ("aggregated_transaction", "national_transaction", "Transaction_amount", "Transaction_count"),
+    "Users": ("map_user", "national_user", "RegisteredUser", "AppOpens"),
+    "Insurance": ("aggregated_insurance", "national_insurance", "Insurance_amount", "Insurance_count"),
+}
+# District drill-down query per data type (queries.py), with the same value and count columns
+DISTRICT_QUERIES = {
+    "Transaction": "district_transaction",
+    "Users": "district_user",
+    "Insurance": "district_insurance",
+}
+
+
+# Leaderboard metrics: label -> metric name in the loader's leaderboard table
+LEADERBOARD_METRICS = {
+    "Registered Users": "registered_users",
+    "App Opens": "app_opens",
+    "Transaction Count": "transaction_count",
+    "Transaction Amount": "transaction_amount",
+    "Insurance Policies": "insurance_count",
+    "Insurance Amount": "insurance_amount",
+}
+
+
+@st.cache_resource
+def get_state_geometry():
+    # simplified + name-normalized once per server process, shared by every session
+    return load_state_geometry()
+
+
+@st.cache_resource
+def get_map_template():
+    # state polygons serialized to JSON once per server process
+    return ChoroplethTemplate(get_state_geometry())
+
+
+@st.cache_resource
+def get_district_index():
+    # {state: bounds}; splitting the all-India districts happens once per machine
+    return district_index()
+
+
+# District templates kept in memory; each is one state's polygons at one detail level
+DISTRICT_TEMPLATE_ENTRIES = 8
+
+
+@st.cache_resource(max_entries=DISTRICT_TEMPLATE_ENTRIES)
+def get_district_template(state_name):
+    # loaded on first drill-down into the state, at the detail level its framing zoom needs
+    view = fit_view(get_district_index()[state_name])
+    return district_template(load_district_geometry(state_name, district_tolerance(view[2])), view)
+
+
+# Serialized Home decks by (cube version, data type, year, quarter), and
+# district decks by ("district", cube version, data type, state, year, quarter)
+DECK_CACHE_ENTRIES = 32
+
+
+@st.cache_resource
+def get_deck_cache():
+    return QueryCache(max_entries=DECK_CACHE_ENTRIES)
+
+
+# ================= Sections =================
+# Page sections are st.fragment functions taking the filters they depend on
+# as arguments. A widget inside a section reruns only that section; a
+# page-level filter reruns the whole page, where the other sections'
+# queries are then served from the shared cache.
+RERUN_HISTORY = 20
+
+
+def record_rerun(name, seconds):
+    history = st.session_state.setdefault("rerun_history", [])
+    history.append({"rerun": name, "ms": round(seconds * 1000, 1)})
+    del history[:-RERUN_HISTORY]
+
+
+def section(name):
+    """st.fragment that times each rerun of the section on its own."""
+    def decorator(fn):
+        @st.fragment
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            alone = "page_run_started" not in st.session_state
+            if alone:
+                start_collection(force=st.query_params.get("debug") == "1")
+            start = time.perf_counter()
+            with span(name):
+                fn(*args, **kwargs)
+            if alone:
+                seconds = time.perf_counter() - start
+                record_rerun(name, seconds)
+                if enabled():
+                    st.caption(f"⏱️ {name} rerun: {seconds * 1000:,.1f} ms")
+        return wrapper
+    return decorator
+
+
+def export_rows(year=None, quarter=None, state=None):
+    """Download the rows of any fact table for the page's filters (None = any),
+    streamed to a file Streamlit serves as a static link."""
+    with st.expander("⬇️ Export data"):
+        col1, col2 = st.columns(2)
+        with col1:
+            table = st.selectbox("Table", EXPORT_TABLES, key="export_table")
+        with col2:
+            fmt = st.radio("Format", FORMATS, format_func=str.upper, horizontal=True, key="export_format")
+        scope = [f"Year {year}" if year is not None else "all years",
+                 f"Quarter {quarter}" if quarter is not None else "all quarters",
+                 state if state is not None else "all states"]
+        st.caption(f"Rows of {table} for {', '.join(scope)}")
+        if st.button("Prepare export", key="export_prepare"):
+            try:
+                name = export_table(table, fmt, year=year, quarter=quarter, state=state)
+            except ImportError:
+                st.error("Parquet export needs pyarrow: pip install pyarrow")
+                return
+            st.markdown(f'<a href="{EXPORT_URL}/{name}" download="{name}">⬇️ Download {name}</a>',
+                        unsafe_allow_html=True)
 
 
 if page == "Home":
     st.title("📊 PhonePe Pulse - India Dashboard")
 
-    # ---- Load raw data from database ----
-    conn = get_connection()
-    df_trans = pd.read_sql("SELECT * FROM aggregated_transaction", conn)
-    df_users = pd.read_sql("SELECT * FROM map_user", conn)
-    df_ins = pd.read_sql("SELECT * FROM aggregated_insurance", conn)
-    conn.close()
-
-    # ---- Normalize state names ----
-    for df in [df_trans, df_users, df_ins]:
-        df["States"] = df["States"].str.strip().str.upper()
-
-    # ---- Load India GeoJSON ----
-    geojson_url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
-    response = requests.get(geojson_url)
-    if response.status_code == 200:
-        india_geojson = response.json()
-    else:
-        st.error("Failed to fetch India GeoJSON. Check your internet connection or URL.")
+    # ---- India GeoJSON (local cache) ----
+    try:
+        with span("home.geometry"):
+            map_template = get_map_template()
+    except Exception:
+        st.error("Failed to load India GeoJSON. Connect once to download it into the local cache.")
         st.stop()
 
-    state_key = "ST_NM"
-    for feature in india_geojson["features"]:
-        props = feature.get("properties", {})
-        if state_key in props:
-            props[state_key] = props[state_key].strip().upper()
-        feature["properties"] = props
-
-    # ---- Filters ----
-    col1, col2, col3 = st.columns(3)
+    # ---- Page filters: every Home section depends on year and quarter ----
+    # Only the distinct (year, quarter) pairs are fetched for the option lists
+    df_periods = run_named("periods")
+    col1, col2 = st.columns(2)
     with col1:
-        selected_data_type = st.selectbox(
-            "Select Data Type", ["Transaction", "Users", "Insurance"], key="data_type"
-        )
-    with col2:
         selected_year = st.selectbox(
-            "Select Year", sorted(df_trans["Years"].unique()), key="year_select"
+            "Select Year", sorted(df_periods["Years"].unique().tolist()), key="year_select"
         )
-    with col3:
+    with col2:
         selected_quarter = st.selectbox(
-            "Select Quarter", ["All"] + sorted(df_trans["Quarter"].unique()), key="quarter_select"
+            "Select Quarter", ["All"] + sorted(df_periods["Quarter"].unique().tolist()), key="quarter_select"
         )
 
-    # ---- Select correct dataframe and columns ----
-    if selected_data_type == "Transaction":
-        df_map = df_trans[df_trans["Years"] == selected_year].copy()
-        value_column = "Transaction_amount"
-        count_column = "Transaction_count"
-    elif selected_data_type == "Users":
-        df_map = df_users[df_users["Years"] == selected_year].copy()
-        value_column = "RegisteredUser"
-        count_column = "AppOpens"
-    else:  # Insurance
-        df_map = df_ins[df_ins["Years"] == selected_year].copy()
-        value_column = "Insurance_amount"
-        count_column = "Insurance_count"
-
-    # Apply quarter filter if needed
-    if selected_quarter != "All" and "Quarter" in df_map.columns:
-        df_map = df_map[df_map["Quarter"] == selected_quarter]
-
-    # Aggregate state-wise
-    df_map_agg = df_map.groupby("States")[[value_column, count_column]].sum().reset_index()
-    state_value_map = df_map_agg.set_index("States")[value_column].to_dict()
-    max_value = max(state_value_map.values()) if state_value_map else 1
-
-    # ---- Prepare choropleth + 3D columns ----
-    for feature in india_geojson["features"]:
-        props = feature["properties"]
-        state_name = props.get(state_key)
-        if not state_name:
-            continue
-        amount = state_value_map.get(state_name, 0)
-        props["value"] = amount
-        norm = amount / max_value
-        props["color"] = [255, int(255 * (1 - norm)), int(255 * (1 - norm))]
-        props["elevation"] = amount / max_value * 500000
-
-    # ---- PyDeck Map ----
-    layer = pdk.Layer(
-        "GeoJsonLayer",
-        data=india_geojson,
-        get_fill_color="properties.color",
-        get_elevation="properties.elevation",
-        extruded=True,
-        pickable=True,
-        auto_highlight=True,
-        stroked=True,
-        filled=True,
-        get_line_color=[255, 255, 255],
-        line_width_min_pixels=1,
-    )
-
-    view_state = pdk.ViewState(latitude=22.9734, longitude=78.6569, zoom=4, pitch=45, bearing=0)
-
-    deck = pdk.Deck(
-        layers=[layer],
-        initial_view_state=view_state,
-        tooltip={
-            "html": "<b>State:</b> {ST_NM} <br/> <b>Value:</b> {value}",
-            "style": {"backgroundColor": "white", "color": "black"}
-        }
-    )
+    # ================= Map, Overview Metrics, State-wise Overview =================
+    @section("home.map_section")
+    def home_map_section(map_template, selected_year, selected_quarter):
+        selected_data_type = st.selectbox("Select Data Type", list(HOME_SOURCES), key="data_type")
+
+        # ---- State-wise aggregate, summed from the in-memory cube ----
+        cubes = get_cubes()
+        table, national_table, value_column, count_column = HOME_SOURCES[selected_data_type]
+        view_quarter = None if selected_quarter == "All" else selected_quarter
+        df_map_agg = cubes.view("home_states", table=table, value_column=value_column, count_column=count_column,
+                                year=selected_year, quarter=view_quarter)
+        df_map_agg = df_map_agg[df_map_agg[value_column].notna()][["States", value_column, count_column]]
+
+        # ---- Choropleth + 3D columns, serialized once per view ----
+        # Polygons are pre-serialized in the template; a new view only encodes
+        # per-state properties and a repeated one reuses the whole deck JSON.
+        deck_cache = get_deck_cache()
+        deck_key = (cubes.version, selected_data_type, selected_year, selected_quarter)
+        deck_json = deck_cache.get(deck_key)
+        if deck_json is None:
+            with span("home.map.build", features=len(map_template)):
+                state_value_map = df_map_agg.set_index("States")[value_column].to_dict()
+                deck_json = map_template.deck_json(state_value_map)
+            deck_cache.put(deck_key, deck_json)
+
+        # ---- PyDeck Map: clicking a state drills into its districts below ----
+        with span("home.map.render", bytes=len(deck_json)):
+            event = st.pydeck_chart(map_template.deck(deck_json), on_select="rerun",
+                                    selection_mode="single-object", key="home_map")
+        clicked = [obj.get("properties", {}).get(STATE_KEY) for obj in event.selection.objects.get(LAYER_ID, [])]
+
+        # ---- Overview Metrics: upstream's all-India figures ----
+        totals = cubes.view("national_totals", table=national_table, state_table=table,
+                            metrics=[value_column, count_column], year=selected_year, quarter=view_quarter).iloc[0]
+        total_users = cubes.view("national_totals", table="national_user", state_table="map_user",
+                                 metrics=["RegisteredUser"], year=selected_year)["RegisteredUser"].iloc[0]
+        st.markdown("### Overview Metrics")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(f"Total {selected_data_type} Value", f"₹{totals[value_column]:,.0f}")
+        with col2:
+            st.metric("Total Count", f"{totals[count_column]:,.0f}")
+        with col3:
+            st.metric("Registered Users", f"{total_users:,.0f}")
 
-    st.pydeck_chart(deck)
+        # ---- State-wise Bar Chart ----
+        st.markdown("### State-wise Overview")
+        st.bar_chart(df_map_agg.set_index("States")[value_column])
+
+        # ---- District drill-down ----
+        home_district_map(selected_data_type, selected_year, selected_quarter, clicked[0] if clicked else None)
+
+    def home_district_map(selected_data_type, selected_year, selected_quarter, clicked_state):
+        """One state's district choropleth: only that state's simplified
+        polygons are sent, joined against one district-level query."""
+        st.markdown("### District Drill-down")
+        states = run_named("states")["States"].tolist()
+        # a new click on the map selects its state; the box can still pick any other
+        if clicked_state and clicked_state != st.session_state.get("drill_clicked"):
+            st.session_state["drill_clicked"] = clicked_state
+            picked = next((state for state in states if match_state(state, [clicked_state])), None)
+            if picked:
+                st.session_state["drill_state"] = picked
+        drill_state = st.selectbox("Select a State (or click it on the map)", [None] + states, key="drill_state",
+                                   format_func=lambda state: "—" if state is None else state)
+        if drill_state is None:
+            return
+
+        try:
+            state_name = match_state(drill_state, get_district_index())
+            if state_name is None:
+                st.info(f"No district boundaries available for {drill_state}.")
+                return
+            with span("home.district.geometry", state=state_name):
+                template = get_district_template(state_name)
+        except Exception:
+            st.error("Failed to load district boundaries. Connect once to download them into the local cache.")
+            return
+
+        _, _, value_column, _ = HOME_SOURCES[selected_data_type]
+        quarters = (1, 4) if selected_quarter == "All" else (selected_quarter, selected_quarter)
+        df_districts = run_named(DISTRICT_QUERIES[selected_data_type], state=drill_state, year=selected_year,
+                                 first_quarter=quarters[0], last_quarter=quarters[1])
+        keys = template.keys()
+        district_values = {}
+        unmatched = []
+        for district, value in zip(df_districts["District"], df_districts[value_column]):
+            key = match_key(str(district))
+            if key in keys:
+                district_values[key] = district_values.get(key, 0) + float(value)
+            else:
+                unmatched.append(str(district))
+
+        deck_cache = get_deck_cache()
+        deck_key = ("district", get_cubes().version, selected_data_type, state_name, selected_year, selected_quarter)
+        deck_json = deck_cache.get(deck_key)
+        if deck_json is None:
+            with span("home.district.build", features=len(template)):
+                deck_json = template.deck_json(district_values)
+            deck_cache.put(deck_key, deck_json)
+        with span("home.district.render", bytes=len(deck_json)):
+            st.pydeck_chart(template.deck(deck_json))
+        if unmatched:
+            st.caption(f"No boundary matched for: {', '.join(sorted(unmatched))}")
+        st.bar_chart(df_districts.set_index("District")[value_column].sort_values(ascending=False))
+
+    home_map_section(map_template, selected_year, selected_quarter)
+
+    # ================= 🔝 Top 10 Districts by Registered Users (Filtered) =================
+    @section("home.top_districts")
+    def home_top_districts(selected_year, selected_quarter):
+        st.markdown("## 🔝 Top 10 Districts by Registered Users")
+
+        # Top-K over the in-memory map_user cube
+        df_top_users = get_cubes().view(
+            "top_districts", year=selected_year, quarter=None if selected_quarter == "All" else selected_quarter
+        )
 
-    # ---- Overview Metrics ----
-    st.markdown("### Overview Metrics")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric(f"Total {selected_data_type} Value", f"₹{df_map_agg[value_column].sum():,.0f}")
-    with col2:
-        st.metric("Total Count", f"{df_map_agg[count_column].sum():,.0f}")
-    with col3:
-        total_users = df_users[df_users["Years"] == selected_year]["RegisteredUser"].sum()
-        st.metric("Registered Users", f"{total_users:,}")
+        # Display data
+        st.dataframe(df_top_users, use_container_width=True)
+
+        # ---- Plotly Chart ----
+        with span("home.top_districts.chart"):
+            fig_top = px.bar(
+                df_top_users,
+                x="Districts",
+                y="TotalUsers",
+                color="States",
+                text_auto=True,
+                title=f"Top 10 Districts - Registered Users ({selected_year}, Quarter: {selected_quarter})"
+            )
+            fig_top.update_layout(
+                xaxis_title="District",
+                yaxis_title="Total Registered Users",
+                title_x=0.5
+            )
+            st.plotly_chart(fig_top, use_container_width=True)
+
+    home_top_districts(selected_year, selected_quarter)
+
+    # ================= 🏆 Leaderboards: districts or pincodes, any metric and region =================
+    @section("home.leaderboards")
+    def home_leaderboards(selected_year, selected_quarter):
+        leaderboard_quarter = 0 if selected_quarter == "All" else selected_quarter
+        st.markdown("## 🏆 Leaderboards")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            leaderboard_level = st.selectbox("Rank", ["Pincodes", "Districts"], key="leaderboard_level")
+        level_key = "pincode" if leaderboard_level == "Pincodes" else "district"
+        level_metrics = {metric for level, metric, *_ in LEADERBOARD_SOURCES if level == level_key}
+        with col2:
+            leaderboard_metric = st.selectbox(
+                "By", [label for label, metric in LEADERBOARD_METRICS.items() if metric in level_metrics],
+                key="leaderboard_metric"
+            )
+        with col3:
+            leaderboard_region = st.selectbox(
+                "Region", ["All India"] + run_named("states")["States"].tolist(), key="leaderboard_region"
+            )
+
+        df_leaders = top_entities(
+            level_key, LEADERBOARD_METRICS[leaderboard_metric], selected_year, quarter=leaderboard_quarter,
+            state="" if leaderboard_region == "All India" else leaderboard_region,
+        )
+        df_leaders = df_leaders.rename(columns={"Entity": leaderboard_level, "Entity_state": "States",
+                                                "Value": leaderboard_metric})
+        st.dataframe(df_leaders.set_index("Position"), use_container_width=True)
 
+        with span("home.leaderboard.chart"):
+            fig_leaders = px.bar(
+                df_leaders,
+                x=leaderboard_level,
+                y=leaderboard_metric,
+                color="States",
+                title=f"Top {leaderboard_level} by {leaderboard_metric} - {leaderboard_region} "
+                      f"({selected_year}, Quarter: {selected_quarter})"
+            )
+            fig_leaders.update_layout(xaxis_type="category", title_x=0.5)
+            st.plotly_chart(fig_leaders, use_container_width=True)
 
-        # ---- State-wise Bar Chart ----
-    st.markdown("### State-wise Overview")
-    st.bar_chart(df_map_agg.set_index("States")[value_column])
-        # ---- 🔝 Top 10 Districts by Registered Users (Filtered) ----
-    st.markdown("## 🔝 Top 10 Districts by Registered Users")
-
-    # Reconnect to DB
-    conn = get_connection()
-
-    # Dynamic query based on selected year and quarter
-    if selected_quarter == "All":
-        query_top_users = f"""
-            SELECT 
-                States,
-                Districts,
-                SUM(RegisteredUser) AS TotalUsers
-            FROM map_user
-            WHERE Years = {selected_year}
-            GROUP BY States, Districts
-            ORDER BY TotalUsers DESC
-            LIMIT 10;
-        """
-    else:
-        query_top_users = f"""
-            SELECT 
-                States,
-                Districts,
-                SUM(RegisteredUser) AS TotalUsers
-            FROM map_user
-            WHERE Years = {selected_year} AND Quarter = {selected_quarter}
-            GROUP BY States, Districts
-            ORDER BY TotalUsers DESC
-            LIMIT 10;
-        """
-
-    df_top_users = pd.read_sql(query_top_users, conn)
-    conn.close()
-
-    # Display data
-    st.dataframe(df_top_users, use_container_width=True)
-
-    # ---- Plotly Chart ----
-    fig_top = px.bar(
-        df_top_users,
-        x="Districts",
-        y="TotalUsers",
-        color="States",
-        text_auto=True,
-        title=f"Top 10 Districts - Registered Users ({selected_year}, Quarter: {selected_quarter})"
-    )
-    fig_top.update_layout(
-        xaxis_title="District",
-        yaxis_title="Total Registered Users",
-        title_x=0.5
-    )
-    st.plotly_chart(fig_top, use_container_width=True)
+    home_leaderboards(selected_year, selected_quarter)
 
+    # ================= ⬇️ Export: fact table rows for the selected period =================
+    @section("home.export")
+    def home_export(selected_year, selected_quarter):
+        export_rows(year=selected_year, quarter=None if selected_quarter == "All" else selected_quarter)
 
+    home_export(selected_year, selected_quarter)
 
 
 # ================= Analysis Page =================
 elif page == "Analysis":
     st.title("📊 Business Case Study Analysis")
 
-    # Dropdown for Case Studies
-    case_study = st.selectbox(
-        "Choose Case Study",
-        [
-            "Decoding Transaction Dynamics on PhonePe",
-            "Device Dominance and User Engagement Analysis",
-            "Insurance Penetration and Growth Potential Analysis",
-            "Transaction Analysis for Market Expansion",
-            "User Engagement and Growth Strategy"
-        ]
-    )
-
-    st.markdown("<h2 style='color:red;'>State-wise Analysis</h2>", unsafe_allow_html=True)
-
-    # Fetch states dynamically from DB
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT States FROM aggregated_transaction ORDER BY States ASC;")
-    states = [row[0] for row in cursor.fetchall()]
-    conn.close()
-
-    selected_state = st.selectbox("Choose a State:", states)
-
-    # ================= CASE STUDY LOGIC =================
-    conn = get_connection()
-
-    # ---------- Case 1 & 4: Transaction Trends ----------
-    if case_study in ["Decoding Transaction Dynamics on PhonePe", "Transaction Analysis for Market Expansion"]:
-        df = pd.read_sql(f"""
-            SELECT Years, SUM(Transaction_count) AS total_transactions,
-                   SUM(Transaction_amount) AS total_amount
-            FROM aggregated_transaction
-            WHERE States = '{selected_state}'
-            GROUP BY Years
-            ORDER BY Years ASC;
-        """, conn)
-
-        if not df.empty:
-            # ---------------- Line Charts ----------------
-            col1, col2 = st.columns(2)
-            with col1:
-                st.subheader("Total Transactions Over Years")
-                fig1 = px.line(df, x="Years", y="total_transactions", markers=True, title="Transactions Trend")
-                st.plotly_chart(fig1, use_container_width=True)
-
-            with col2:
-                st.subheader("Total Transaction Amount Over Years (₹)")
-                fig2 = px.line(df, x="Years", y="total_amount", markers=True, title="Transaction Amount Trend")
-                st.plotly_chart(fig2, use_container_width=True)
-
-            # ---------------- Year-over-Year Growth ----------------
-            df['transaction_growth'] = df['total_transactions'].pct_change() * 100
-            df['amount_growth'] = df['total_amount'].pct_change() * 100
-            col3, col4 = st.columns(2)
-            with col3:
-                st.subheader("YoY Transaction Growth (%)")
-                fig3 = px.bar(df, x="Years", y="transaction_growth", text=df['transaction_growth'].round(2),
-                              title="Transaction Growth YoY")
-                st.plotly_chart(fig3, use_container_width=True)
-
-            with col4:
-                st.subheader("YoY Transaction Amount Growth (%)")
-                fig4 = px.bar(df, x="Years", y="amount_growth", text=df['amount_growth'].round(2),
-                              title="Amount Growth YoY")
-                st.plotly_chart(fig4, use_container_width=True)
-
-            # ---------------- Payment Category Performance ----------------
-            df_cat = pd.read_sql(f"""
-                SELECT Transaction_type, SUM(Transaction_count) AS total_count,
-                       SUM(Transaction_amount) AS total_amount
-                FROM aggregated_transaction
-                WHERE States = '{selected_state}'
-                GROUP BY Transaction_type;
-            """, conn)
-
-            st.markdown("<h2 style='color:red;'>Payment Category Performance</h2>", unsafe_allow_html=True)
-            col5, col6 = st.columns(2)
-            with col5:
-                st.subheader("Transaction Count Distribution")
-                fig5 = px.pie(df_cat, names="Transaction_type", values="total_count", hole=0.4)
-                st.plotly_chart(fig5, use_container_width=True)
-
-            with col6:
-                st.subheader("Transaction Amount Distribution (₹)")
-                fig6 = px.pie(df_cat, names="Transaction_type", values="total_amount", hole=0.4)
-                st.plotly_chart(fig6, use_container_width=True)
-
-            # ---------------- Bar Chart Comparison ----------------
-            st.subheader("Payment Categories Comparison (Bar Chart)")
-            fig_bar = px.bar(df_cat, x="Transaction_type", y="total_amount", hover_data=["total_count"],
-                             barmode="group", title="Payment Category vs Amount")
-            st.plotly_chart(fig_bar, use_container_width=True)
-
-            # ---------------- Heatmap: Transaction Amount by Type & Year ----------------
-            df_cat_year = pd.read_sql(f"""
-                SELECT Years, Transaction_type, SUM(Transaction_amount) AS total_amount
-                FROM aggregated_transaction
-                WHERE States = '{selected_state}'
-                GROUP BY Years, Transaction_type;
-            """, conn)
-            st.subheader("Heatmap: Transaction Amount by Type & Year")
-            fig_heat = px.density_heatmap(df_cat_year, x="Years", y="Transaction_type", z="total_amount",
-                                          color_continuous_scale='Viridis')
-            st.plotly_chart(fig_heat, use_container_width=True)
-
-    # ---------- Case 2: Device Dominance ----------
-    elif case_study == "Device Dominance and User Engagement Analysis":
-        df_user = pd.read_sql(f"""
-            SELECT Years, Brands, SUM(Transaction_count) AS total_users, AVG(Percentage) AS percentage
-            FROM aggregated_user
-            WHERE States = '{selected_state}'
-            GROUP BY Years, Brands
-            ORDER BY Years;
-        """, conn)
-
-        if not df_user.empty:
-            st.subheader("📱 Device-wise User Distribution")
-            fig_bar = px.bar(df_user, x="Years", y="total_users", color="Brands", barmode="group",
-                             title="Device-wise Users")
-            st.plotly_chart(fig_bar, use_container_width=True)
-
-            st.subheader("Device Share % Over Time")
-            fig_line = px.line(df_user, x="Years", y="percentage", color="Brands", markers=True,
-                               title="Device Market Share Trend")
-            st.plotly_chart(fig_line, use_container_width=True)
-
-            # ---------------- Stacked Area ----------------
-            st.subheader("Device Usage Trend (Stacked Area)")
-            fig_area = px.area(df_user, x="Years", y="total_users", color="Brands", title="Stacked Device Trend")
-            st.plotly_chart(fig_area, use_container_width=True)
-
-            # ---------------- Pie Chart Latest Year ----------------
-            latest_year = df_user['Years'].max()
-            df_latest = df_user[df_user['Years'] == latest_year]
-            st.subheader(f"Device Share in {latest_year}")
-            fig_pie = px.pie(df_latest, names="Brands", values="total_users", hole=0.4)
-            st.plotly_chart(fig_pie, use_container_width=True)
-
-    # ---------- Case 3: Insurance Analysis ----------
-    elif case_study == "Insurance Penetration and Growth Potential Analysis":
-        df_ins = pd.read_sql(f"""
-            SELECT Years, SUM(Insurance_count) AS total_policies,
-                   SUM(Insurance_amount) AS total_amount
-            FROM aggregated_insurance
-            WHERE States = '{selected_state}'
-            GROUP BY Years
-            ORDER BY Years ASC;
-        """, conn)
-
-        if not df_ins.empty:
-            col1, col2 = st.columns(2)
-            with col1:
-                st.subheader("Insurance Policies Over Years")
-                fig1 = px.line(df_ins, x="Years", y="total_policies", markers=True, title="Policy Count Trend")
-                st.plotly_chart(fig1, use_container_width=True)
-
-            with col2:
-                st.subheader("Insurance Amount Over Years")
-                fig2 = px.line(df_ins, x="Years", y="total_amount", markers=True, title="Insurance Amount Trend")
-                st.plotly_chart(fig2, use_container_width=True)
-
-            # ---------------- YoY Growth ----------------
-            df_ins['policy_growth'] = df_ins['total_policies'].pct_change() * 100
-            df_ins['amount_growth'] = df_ins['total_amount'].pct_change() * 100
-            col3, col4 = st.columns(2)
-            with col3:
-                st.subheader("YoY Policy Growth (%)")
-                fig3 = px.bar(df_ins, x="Years", y="policy_growth", text=df_ins['policy_growth'].round(2))
-                st.plotly_chart(fig3, use_container_width=True)
-
-            with col4:
-                st.subheader("YoY Insurance Amount Growth (%)")
-                fig4 = px.bar(df_ins, x="Years", y="amount_growth", text=df_ins['amount_growth'].round(2))
-                st.plotly_chart(fig4, use_container_width=True)
-
-    # ---------- Case 5: User Engagement ----------
-    elif case_study == "User Engagement and Growth Strategy":
-        df_map = pd.read_sql(f"""
-            SELECT Years, SUM(RegisteredUser) AS total_users,
-                   SUM(AppOpens) AS total_opens
-            FROM map_user
-            WHERE States = '{selected_state}'
-            GROUP BY Years
-            ORDER BY Years ASC;
-        """, conn)
-
-        if not df_map.empty:
+    case_studies = [
+        "Decoding Transaction Dynamics on PhonePe",
+        "Device Dominance and User Engagement Analysis",
+        "Insurance Penetration and Growth Potential Analysis",
+        "Transaction Analysis for Market Expansion",
+        "User Engagement and Growth Strategy",
+    ]
+
+    # ================= CASE STUDIES =================
+    @section("analysis.case_studies")
+    def analysis_case_studies():
+        # Dropdown for Case Studies
+        case_study = st.selectbox("Choose Case Study", case_studies)
+
+        st.markdown("<h2 style='color:red;'>State-wise Analysis</h2>", unsafe_allow_html=True)
+
+        # Fetch states dynamically from DB
+        states = run_named("states")["States"].tolist()
+
+        selected_state = st.selectbox("Choose a State:", states)
+
+        # Every case study is summed from the in-memory cubes
+        cubes = get_cubes()
+
+        # ================= CASE STUDY LOGIC =================
+
+        with span("analysis.case_study", case=case_study, state=selected_state):
+            # ---------- Case 1 & 4: Transaction Trends ----------
+            if case_study in ["Decoding Transaction Dynamics on PhonePe", "Transaction Analysis for Market Expansion"]:
+                df = cubes.view("transaction_yearly", state=selected_state)
+
+                if not df.empty:
+                    # ---------------- Line Charts ----------------
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.subheader("Total Transactions Over Years")
+                        fig1 = px.line(df, x="Years", y="total_transactions", markers=True, title="Transactions Trend")
+                        st.plotly_chart(fig1, use_container_width=True)
+
+                    with col2:
+                        st.subheader("Total Transaction Amount Over Years (₹)")
+                        fig2 = px.line(df, x="Years", y="total_amount", markers=True, title="Transaction Amount Trend")
+                        st.plotly_chart(fig2, use_container_width=True)
+
+                    # ---------------- Year-over-Year Growth (from the cube's year axis) ----------------
+                    col3, col4 = st.columns(2)
+                    with col3:
+                        st.subheader("YoY Transaction Growth (%)")
+                        fig3 = px.bar(df, x="Years", y="transaction_growth", text=df['transaction_growth'].round(2),
+                                      title="Transaction Growth YoY")
+                        st.plotly_chart(fig3, use_container_width=True)
+
+                    with col4:
+                        st.subheader("YoY Transaction Amount Growth (%)")
+                        fig4 = px.bar(df, x="Years", y="amount_growth", text=df['amount_growth'].round(2),
+                                      title="Amount Growth YoY")
+                        st.plotly_chart(fig4, use_container_width=True)
+
+                    # ---------------- Payment Category Performance ----------------
+                    df_cat = cubes.view("transaction_categories", state=selected_state)
+
+                    st.markdown("<h2 style='color:red;'>Payment Category Performance</h2>", unsafe_allow_html=True)
+                    col5, col6 = st.columns(2)
+                    with col5:
+                        st.subheader("Transaction Count Distribution")
+                        fig5 = px.pie(df_cat, names="Transaction_type", values="total_count", hole=0.4)
+                        st.plotly_chart(fig5, use_container_width=True)
+
+                    with col6:
+                        st.subheader("Transaction Amount Distribution (₹)")
+                        fig6 = px.pie(df_cat, names="Transaction_type", values="total_amount", hole=0.4)
+                        st.plotly_chart(fig6, use_container_width=True)
+
+                    # ---------------- Bar Chart Comparison ----------------
+                    st.subheader("Payment Categories Comparison (Bar Chart)")
+                    fig_bar = px.bar(df_cat, x="Transaction_type", y="total_amount", hover_data=["total_count"],
+                                     barmode="group", title="Payment Category vs Amount")
+                    st.plotly_chart(fig_bar, use_container_width=True)
+
+                    # ---------------- Heatmap: Transaction Amount by Type & Year ----------------
+                    df_cat_year = cubes.view("transaction_type_year", state=selected_state)
+                    st.subheader("Heatmap: Transaction Amount by Type & Year")
+                    fig_heat = px.density_heatmap(df_cat_year, x="Years", y="Transaction_type", z="total_amount",
+                                                  color_continuous_scale='Viridis')
+                    st.plotly_chart(fig_heat, use_container_width=True)
+
+            # ---------- Case 2: Device Dominance ----------
+            elif case_study == "Device Dominance and User Engagement Analysis":
+                df_user = cubes.view("device_brands", state=selected_state)
+
+                if not df_user.empty:
+                    st.subheader("📱 Device-wise User Distribution")
+                    fig_bar = px.bar(df_user, x="Years", y="total_users", color="Brands", barmode="group",
+                                     title="Device-wise Users")
+                    st.plotly_chart(fig_bar, use_container_width=True)
+
+                    st.subheader("Device Share % Over Time")
+                    fig_line = px.line(df_user, x="Years", y="percentage", color="Brands", markers=True,
+                                       title="Device Market Share Trend")
+                    st.plotly_chart(fig_line, use_container_width=True)
+
+                    # ---------------- Stacked Area ----------------
+                    st.subheader("Device Usage Trend (Stacked Area)")
+                    fig_area = px.area(df_user, x="Years", y="total_users", color="Brands",
+                                       title="Stacked Device Trend")
+                    st.plotly_chart(fig_area, use_container_width=True)
+
+                    # ---------------- Pie Chart Latest Year ----------------
+                    latest_year = df_user['Years'].max()
+                    df_latest = df_user[df_user['Years'] == latest_year]
+                    st.subheader(f"Device Share in {latest_year}")
+                    fig_pie = px.pie(df_latest, names="Brands", values="total_users", hole=0.4)
+                    st.plotly_chart(fig_pie, use_container_width=True)
+
+            # ---------- Case 3: Insurance Analysis ----------
+            elif case_study == "Insurance Penetration and Growth Potential Analysis":
+                df_ins = cubes.view("insurance_yearly", state=selected_state)
+
+                if not df_ins.empty:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.subheader("Insurance Policies Over Years")
+                        fig1 = px.line(df_ins, x="Years", y="total_policies", markers=True, title="Policy Count Trend")
+                        st.plotly_chart(fig1, use_container_width=True)
+
+                    with col2:
+                        st.subheader("Insurance Amount Over Years")
+                        fig2 = px.line(df_ins, x="Years", y="total_amount", markers=True,
+                                       title="Insurance Amount Trend")
+                        st.plotly_chart(fig2, use_container_width=True)
+
+                    # ---------------- YoY Growth (from the cube's year axis) ----------------
+                    col3, col4 = st.columns(2)
+                    with col3:
+                        st.subheader("YoY Policy Growth (%)")
+                        fig3 = px.bar(df_ins, x="Years", y="policy_growth", text=df_ins['policy_growth'].round(2))
+                        st.plotly_chart(fig3, use_container_width=True)
+
+                    with col4:
+                        st.subheader("YoY Insurance Amount Growth (%)")
+                        fig4 = px.bar(df_ins, x="Years", y="amount_growth", text=df_ins['amount_growth'].round(2))
+                        st.plotly_chart(fig4, use_container_width=True)
+
+            # ---------- Case 5: User Engagement ----------
+            elif case_study == "User Engagement and Growth Strategy":
+                df_map = cubes.view("user_engagement_yearly", state=selected_state)
+
+                if not df_map.empty:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.subheader("Registered Users Over Years")
+                        fig1 = px.line(df_map, x="Years", y="total_users", markers=True, title="Registered Users Trend")
+                        st.plotly_chart(fig1, use_container_width=True)
+
+                    with col2:
+                        st.subheader("App Opens Over Years")
+                        fig2 = px.line(df_map, x="Years", y="total_opens", markers=True, title="App Opens Trend")
+                        st.plotly_chart(fig2, use_container_width=True)
+
+                    # ---------------- Engagement Ratio ----------------
+                    st.subheader("App Opens per User Over Years")
+                    fig3 = px.line(df_map, x="Years", y="opens_per_user", markers=True,
+                                   title="Engagement Ratio (Opens per User)")
+                    st.plotly_chart(fig3, use_container_width=True)
+
+                    # ---------------- Scatter: Users vs Opens ----------------
+                    st.subheader("User Engagement Scatter Plot")
+                    fig4 = px.scatter(df_map, x="total_users", y="total_opens", color="Years",
+                                      size="total_users", hover_name="Years", title="Users vs App Opens")
+                    st.plotly_chart(fig4, use_container_width=True)
+
+        # ---- Export: the selected state's rows of any fact table ----
+        export_rows(state=selected_state)
+
+    analysis_case_studies()
+
+    # ================= CROSS-STATE GROWTH RANKING =================
+    @section("analysis.growth_ranking")
+    def analysis_growth_ranking():
+        st.markdown("<h2 style='color:red;'>Cross-State Growth Ranking</h2>", unsafe_allow_html=True)
+        growth_metrics = {
+            "Transaction Amount": "Transaction_amount_yoy",
+            "Transaction Count": "Transaction_count_yoy",
+            "Insurance Amount": "Insurance_amount_yoy",
+            "Registered Users": "RegisteredUser_yoy",
+            "App Opens": "AppOpens_yoy",
+        }
+        # the first year has nothing to grow from
+        ranking_years = sorted(run_named("periods")["Years"].unique().tolist())[1:]
+        if ranking_years:
             col1, col2 = st.columns(2)
             with col1:
-                st.subheader("Registered Users Over Years")
-                fig1 = px.line(df_map, x="Years", y="total_users", markers=True, title="Registered Users Trend")
-                st.plotly_chart(fig1, use_container_width=True)
-
+                ranking_year = st.selectbox("Year", ranking_years, index=len(ranking_years) - 1, key="ranking_year")
             with col2:
-                st.subheader("App Opens Over Years")
-                fig2 = px.line(df_map, x="Years", y="total_opens", markers=True, title="App Opens Trend")
-                st.plotly_chart(fig2, use_container_width=True)
-
-            # ---------------- Engagement Ratio ----------------
-            df_map['opens_per_user'] = df_map['total_opens'] / df_map['total_users']
-            st.subheader("App Opens per User Over Years")
-            fig3 = px.line(df_map, x="Years", y="opens_per_user", markers=True,
-                           title="Engagement Ratio (Opens per User)")
-            st.plotly_chart(fig3, use_container_width=True)
-
-            # ---------------- Scatter: Users vs Opens ----------------
-            st.subheader("User Engagement Scatter Plot")
-            fig4 = px.scatter(df_map, x="total_users", y="total_opens", color="Years",
-                              size="total_users", hover_name="Years", title="Users vs App Opens")
-            st.plotly_chart(fig4, use_container_width=True)
-
-    conn.close()
+                ranking_metric = st.selectbox("Metric", list(growth_metrics), key="ranking_metric")
+
+            growth_column = growth_metrics[ranking_metric]
+            df_rank = run_named("state_growth_ranking", year=ranking_year)
+            df_rank = df_rank[df_rank[growth_column].notna()].sort_values(growth_column, ascending=False)
+            fig_rank = px.bar(df_rank, x="States", y=growth_column, text=df_rank[growth_column].round(1),
+                              title=f"YoY {ranking_metric} Growth (%) by State, {ranking_year}")
+            fig_rank.update_layout(xaxis_title="State", yaxis_title="YoY Growth (%)", title_x=0.5)
+            st.plotly_chart(fig_rank, use_container_width=True)
+
+    analysis_growth_ranking()
+
+
+# a full run ends here; section reruns after this are timed on their own
+record_rerun("page", time.perf_counter() - st.session_state.pop("page_run_started"))
+
+# ================= Debug Panel =================
+if enabled():
+    with st.sidebar.expander("⏱️ Timings for this rerun", expanded=False):
+        spans = collected()
+        st.caption(f"{len(spans)} spans, {sum(s.seconds for s in spans if s.depth == 0) * 1000:,.1f} ms top-level")
+        st.dataframe(pd.DataFrame(
+            [{"span": "  " * s.depth + s.name, "ms": round(s.seconds * 1000, 2),
+              **{k: str(v) for k, v in s.fields.items()}} for s in spans]
+        ), use_container_width=True)
+        st.caption("Recent reruns (page = whole script, otherwise one section on its own)")
+        st.dataframe(pd.DataFrame(st.session_state.get("rerun_history", [])), use_container_width=True)
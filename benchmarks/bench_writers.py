@@ -0,0 +1,84 @@
+"""Compare the loader's bulk writer modes against a local MySQL/MariaDB.
+
+    python benchmarks/bench_writers.py --rows 200000 --chunk-size 1000
+
+Each mode loads the same synthetic aggregated_transaction rows into a
+scratch copy of the table and reports rows/second. The server needs
+local_infile=ON for the infile mode.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+
+from config import DB_CONFIG
+from loader import KEY_COLUMNS, DATASETS, create_queries
+from writers import WRITER_MODES, CHUNK_SIZE, make_writer, disable_keys, enable_keys
+
+SCRATCH_TABLE = "bench_aggregated_transaction"
+
+
+def synthetic_rows(count, seed=0):
+    rng = random.Random(seed)
+    types = ["Recharge & bill payments", "Peer-to-peer payments", "Merchant payments",
+             "Financial Services", "Others"]
+    rows = []
+    for i in range(count):
+        state = f"state-{i // (len(types) * 4 * 10) % 1000}"
+        year = 2018 + i // (len(types) * 4) % 10
+        rows.append((state, year, i // len(types) % 4 + 1, types[i % len(types)],
+                     rng.randint(1, 10 ** 8), rng.randint(1, 10 ** 11)))
+    # keys repeat once the synthetic space is exhausted; dedupe so every mode inserts the same set
+    return list({row[:4]: row for row in rows}.values())
+
+
+def run(db, cursor, mode, rows, chunk_size, batch_size, keys_off):
+    cursor.execute(f"TRUNCATE TABLE {SCRATCH_TABLE}")
+    dataset = DATASETS[0]
+    writer = make_writer(mode, cursor, SCRATCH_TABLE, KEY_COLUMNS, dataset.columns, chunk_size=chunk_size)
+    start = time.perf_counter()
+    if keys_off:
+        disable_keys(cursor, SCRATCH_TABLE)
+    for i in range(0, len(rows), batch_size):
+        writer.write(rows[i:i + batch_size])
+        db.commit()
+    if keys_off:
+        enable_keys(cursor, SCRATCH_TABLE)
+    elapsed = time.perf_counter() - start
+    cursor.execute(f"SELECT COUNT(*) FROM {SCRATCH_TABLE}")
+    loaded = cursor.fetchone()[0]
+    return elapsed, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per commit, as in the loader")
+    parser.add_argument("--modes", nargs="+", choices=WRITER_MODES, default=WRITER_MODES)
+    parser.add_argument("--disable-keys", action="store_true")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    db = mysql.connector.connect(**DB_CONFIG, allow_local_infile=True)
+    cursor = db.cursor()
+    cursor.execute(next(q for q in create_queries if "aggregated_transaction (" in q))
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {SCRATCH_TABLE} LIKE aggregated_transaction")
+
+    print(f"{len(rows):,} rows, chunk size {args.chunk_size}, commit every {args.batch_size}")
+    for mode in args.modes:
+        elapsed, loaded = run(db, cursor, mode, rows, args.chunk_size, args.batch_size, args.disable_keys)
+        print(f"{mode:>12}: {elapsed:8.2f}s  {len(rows) / elapsed:12,.0f} rows/s  ({loaded:,} rows in table)")
+
+    cursor.execute(f"DROP TABLE {SCRATCH_TABLE}")
+    cursor.close()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
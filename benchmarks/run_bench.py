@@ -0,0 +1,313 @@
+"""Loader throughput and dashboard query latency benchmarks.
+
+    # parse-only ingest of a generated tree, no database needed
+    python benchmarks/run_bench.py --generate --states 36 --districts 40 --years 7 --ingest null
+
+    # full load into MySQL, then time every dashboard query against it
+    python benchmarks/run_bench.py --data-root pulse-main/data --ingest mysql --queries mysql
+
+    # compare with an earlier run
+    python benchmarks/run_bench.py ... --output new.json --compare old.json
+
+Ingest reports files/s, rows/s and peak RSS (this process plus parser
+workers). Query latency is measured without the dashboard's result cache:
+every named query in queries.py runs --repeat times and p50/p95 are
+reported. The Home and Analysis views are timed the same way on the
+in-memory cubes (cube.py), after timing one full cube build from the same
+database. The mysql targets write to the database configured in .env.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import loader
+from cube import build_cubes
+from queries import QUERIES, bind
+from rollups import LEADERBOARD_SIZE
+from synth_pulse import generate
+
+
+class NullWriter:
+    """Counts rows without storing them, to measure walk + parse alone."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def write(self, rows):
+        self.rows += len(rows)
+
+    def rows_per_second(self):
+        return 0.0
+
+
+def peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return {"main_mb": own / scale, "largest_worker_mb": children / scale}
+
+
+# ================= INGEST =================
+def bench_ingest(args):
+    db = cursor = staging = None
+    if args.ingest == "mysql":
+        import mysql.connector
+        from config import DB_CONFIG
+
+        db = mysql.connector.connect(**DB_CONFIG, allow_local_infile=args.writer == "infile")
+        cursor = db.cursor()
+        for query in loader.create_queries + [rollup.create for rollup in loader.ROLLUPS + loader.DERIVED]:
+            cursor.execute(query)
+        db.commit()
+    elif args.ingest == "parquet":
+        staging = tempfile.mkdtemp(prefix="pulse-bench-snapshot-")
+
+    source = loader.open_source(args.data_root)
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    tables = {}
+    start = time.perf_counter()
+    try:
+        for i, dataset in enumerate(loader.DATASETS):
+            if args.ingest == "mysql":
+                writer = loader.make_writer(args.writer, cursor, dataset.table, loader.KEY_COLUMNS,
+                                            dataset.columns, key_size=dataset.key_size)
+            elif args.ingest == "parquet":
+                writer = loader.ParquetTableWriter(staging, dataset.table, loader.KEY_COLUMNS, dataset.columns)
+            else:
+                writer = NullWriter()
+            table_start = time.perf_counter()
+            files, rows, _ = loader.load_dataset(db, cursor, i, source, {}, executor,
+                                                 args.workers, args.batch_size, writer)
+            if hasattr(writer, "close"):
+                writer.close()
+            seconds = time.perf_counter() - table_start
+            tables[dataset.table] = {"files": files, "rows": rows, "seconds": seconds,
+                                     "rows_per_second": rows / seconds if seconds else 0.0}
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if db is not None:
+            db.close()
+        if staging:
+            shutil.rmtree(staging, ignore_errors=True)
+    seconds = time.perf_counter() - start
+
+    files = sum(t["files"] for t in tables.values())
+    rows = sum(t["rows"] for t in tables.values())
+    return {
+        "target": args.ingest,
+        "writer": args.writer if args.ingest == "mysql" else None,
+        "workers": args.workers,
+        "files": files,
+        "rows": rows,
+        "seconds": seconds,
+        "files_per_second": files / seconds,
+        "rows_per_second": rows / seconds,
+        "peak_rss": peak_rss_mb(),
+        "tables": tables,
+    }
+
+
+# ================= QUERIES =================
+def _query_runner(backend):
+    if backend == "parquet":
+        from snapshot import SNAPSHOT_DIR, connect_snapshot
+
+        conn = connect_snapshot(os.getenv("PULSE_SNAPSHOT_DIR", SNAPSHOT_DIR))
+
+        def run(sql, params):
+            return conn.execute(sql.replace("%s", "?"), list(params)).fetchall()
+
+        def read(sql):
+            return conn.execute(sql).df()
+        return run, read, conn.close
+
+    import mysql.connector
+    from config import DB_CONFIG
+
+    db = mysql.connector.connect(**DB_CONFIG)
+    cursors = {}
+
+    def run(sql, params):
+        # one prepared statement per query, as the dashboard keeps per connection
+        if sql not in cursors:
+            cursors[sql] = db.cursor(prepared=True)
+        cursor = cursors[sql]
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def read(sql):
+        cursor = db.cursor()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        columns = [column[0] for column in cursor.description]
+        cursor.close()
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    return run, read, db.close
+
+
+def _latency(fn, repeat):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def _cube_views(state, year, quarter):
+    """(view name, arguments) for every cube view the dashboard calls, on the sample period."""
+    views = [
+        ("home_states", dict(table="aggregated_transaction", value_column="Transaction_amount",
+                             count_column="Transaction_count", year=year, quarter=quarter)),
+        ("home_states", dict(table="map_user", value_column="RegisteredUser", count_column="AppOpens",
+                             year=year, quarter=None)),
+        ("national_totals", dict(table="national_transaction", state_table="aggregated_transaction",
+                                 metrics=["Transaction_amount", "Transaction_count"], year=year, quarter=quarter)),
+        ("top_districts", dict(year=year, quarter=None)),
+    ]
+    views += [(name, dict(state=state)) for name in
+              ("transaction_yearly", "transaction_categories", "transaction_type_year", "device_brands",
+               "insurance_yearly", "user_engagement_yearly")]
+    return views
+
+
+def bench_cubes(read, state, year, quarter, repeat):
+    start = time.perf_counter()
+    cubes = build_cubes(read, version=None)
+    build_seconds = time.perf_counter() - start
+    results = {}
+    for name, view_args in _cube_views(state, year, quarter):
+        key = name if name not in results else f"{name}:{view_args['table']}"
+        results[key] = _latency(lambda: cubes.view(name, **view_args), repeat)
+    return {"build_seconds": build_seconds, "results": results}
+
+
+def bench_queries(args):
+    run, read, close = _query_runner(args.queries)
+    try:
+        sample = run("SELECT States, Years, Quarter FROM rollup_state_quarter "
+                     "ORDER BY Years DESC, Quarter DESC LIMIT 1", ())
+        if not sample:
+            sys.exit("No data loaded; nothing to query.")
+        state, year, quarter = sample[0]
+        values = {"state": state, "year": year, "quarter": quarter, "first_quarter": 1, "last_quarter": 4,
+                  "level": "district", "metric": "registered_users", "limit": LEADERBOARD_SIZE}
+
+        results = {}
+        for name in QUERIES:
+            sql, params = bind(name, **values)
+            results[name] = _latency(lambda: run(sql, params), args.repeat)
+        return {"backend": args.queries, "sample": {k: str(v) for k, v in values.items()}, "results": results,
+                "cubes": bench_cubes(read, state, year, quarter, args.repeat)}
+    finally:
+        close()
+
+
+# ================= REPORT =================
+def compare(current, previous):
+    def ratio(new, old):
+        return f"{new / old:5.2f}x" if old else "  n/a"
+
+    if "ingest" in current and "ingest" in previous:
+        print(f"ingest rows/s   {ratio(current['ingest']['rows_per_second'], previous['ingest']['rows_per_second'])}"
+              f" of previous")
+    if "queries" in current and "queries" in previous:
+        for name, result in current["queries"]["results"].items():
+            old = previous["queries"]["results"].get(name)
+            if old:
+                print(f"{name:>24} p50 {result['p50_ms']:8.2f} ms  ({ratio(result['p50_ms'], old['p50_ms'])} of previous)")
+        current_cubes, previous_cubes = current["queries"].get("cubes"), previous["queries"].get("cubes")
+        if current_cubes and previous_cubes:
+            print(f"{'cube build':>24}     {current_cubes['build_seconds']:8.2f} s   "
+                  f"({ratio(current_cubes['build_seconds'], previous_cubes['build_seconds'])} of previous)")
+            for name, result in current_cubes["results"].items():
+                old = previous_cubes["results"].get(name)
+                if old:
+                    print(f"{name:>24} p50 {result['p50_ms']:8.3f} ms  "
+                          f"({ratio(result['p50_ms'], old['p50_ms'])} of previous)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-root", help="existing pulse-main/data tree or repository archive")
+    parser.add_argument("--generate", action="store_true", help="generate a synthetic tree in a temp dir")
+    parser.add_argument("--states", type=int, default=36)
+    parser.add_argument("--districts", type=int, default=20)
+    parser.add_argument("--pincodes", type=int, default=10)
+    parser.add_argument("--years", type=int, default=7)
+    parser.add_argument("--ingest", choices=["none", "null", "parquet", "mysql"], default="null",
+                        help="null = walk and parse only")
+    parser.add_argument("--writer", choices=loader.WRITER_MODES, default="executemany")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=loader.BATCH_SIZE)
+    parser.add_argument("--queries", choices=["none", "mysql", "parquet"], default="none")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    generated = None
+    if args.generate:
+        generated = tempfile.mkdtemp(prefix="pulse-synth-")
+        generate(generated, args.states, args.districts, args.pincodes, args.years)
+        args.data_root = generated
+    elif args.ingest != "none" and not args.data_root:
+        parser.error("--data-root or --generate is required for ingest benchmarks")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "dataset": {"data_root": None if generated else args.data_root,
+                    "synthetic": {"states": args.states, "districts": args.districts,
+                                  "pincodes": args.pincodes, "years": args.years} if generated else None},
+    }
+    try:
+        if args.ingest != "none":
+            report["ingest"] = bench_ingest(args)
+            print(f"ingest: {report['ingest']['files_per_second']:,.0f} files/s, "
+                  f"{report['ingest']['rows_per_second']:,.0f} rows/s, "
+                  f"peak RSS {report['ingest']['peak_rss']['main_mb']:.0f} MB")
+        if args.queries != "none":
+            report["queries"] = bench_queries(args)
+            for name, result in report["queries"]["results"].items():
+                print(f"{name:>24}  p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms")
+            cubes = report["queries"]["cubes"]
+            print(f"{'cube build':>24}  {cubes['build_seconds']:.2f} s")
+            for name, result in cubes["results"].items():
+                print(f"{name:>24}  p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms")
+    finally:
+        if generated:
+            shutil.rmtree(generated, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Generate a synthetic pulse-main/data tree for benchmarks.
+
+    python benchmarks/synth_pulse.py --out /tmp/pulse-synth --states 36 --districts 20 --pincodes 10 --years 7
+
+Files use the same JSON shapes as the upstream PhonePe Pulse repository for
+the datasets loader.py ingests, so the loader can't tell the difference.
+The country-level files hold the sums (and top 10 lists) of the state
+files. Values are random but deterministic for a given --seed.
+"""
+import os
+import json
+import random
+import argparse
+from collections import defaultdict
+
+TRANSACTION_TYPES = ["Recharge & bill payments", "Peer-to-peer payments", "Merchant payments",
+                     "Financial Services", "Others"]
+BRANDS = ["Xiaomi", "Samsung", "Vivo", "Oppo", "OnePlus", "Realme", "Apple", "Motorola", "Lenovo", "Huawei"]
+COUNTRY_PATH = "country/india"
+STATE_PATH = "country/india/state"
+TOP_SIZE = 10
+
+
+def _write(root, dataset_path, state, year, quarter, payload):
+    """Write a state file, or a country-level file when state is None."""
+    if state is None:
+        directory = os.path.join(root, dataset_path, COUNTRY_PATH, str(year))
+    else:
+        directory = os.path.join(root, dataset_path, STATE_PATH, state, str(year))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{quarter}.json"), "w") as f:
+        json.dump({"success": True, "code": "SUCCESS", "data": payload}, f)
+
+
+def _metric(rng):
+    count = rng.randint(1_000, 50_000_000)
+    return {"type": "TOTAL", "count": count, "amount": round(count * rng.uniform(50, 3000), 2)}
+
+
+def _top(entries, key):
+    return sorted(entries, key=key, reverse=True)[:TOP_SIZE]
+
+
+def _top_metric(totals):
+    """Top 10 entityName/metric entries of {name: [count, amount]}."""
+    return [{"entityName": name, "metric": {"type": "TOTAL", "count": count, "amount": round(amount, 2)}}
+            for name, (count, amount) in _top(totals.items(), key=lambda item: item[1][1])]
+
+
+def _top_users(totals):
+    return [{"name": name, "registeredUsers": users} for name, users in _top(totals.items(), key=lambda item: item[1])]
+
+
+def _metric_totals():
+    return defaultdict(lambda: [0, 0.0])
+
+
+def _add(totals, name, metric):
+    totals[name][0] += metric["count"]
+    totals[name][1] += metric["amount"]
+
+
+def generate(root, states=36, districts=20, pincodes=10, years=7, first_year=2018, seed=0):
+    """Write the tree and return the number of files written."""
+    rng = random.Random(seed)
+    state_names = [f"synthetic-state-{i:02d}" for i in range(states)]
+    files = 0
+    # per (year, quarter): dataset -> level -> {name: total}, summed over states
+    national = defaultdict(lambda: defaultdict(lambda: defaultdict(_metric_totals)))
+    user_totals = defaultdict(lambda: [0, 0])
+    for s, state in enumerate(state_names):
+        district_names = [f"district {s:02d}-{d:03d} district" for d in range(districts)]
+        pincode_names = [str(100000 + s * 10000 + p) for p in range(pincodes)]
+        for year in range(first_year, first_year + years):
+            for quarter in range(1, 5):
+                period = national[year, quarter]
+                transactions = [(name, _metric(rng)) for name in TRANSACTION_TYPES]
+                for name, metric in transactions:
+                    _add(period["transaction"]["type"], name, metric)
+                _write(root, "aggregated/transaction", state, year, quarter, {
+                    "from": 0, "to": 0,
+                    "transactionData": [{"name": name, "paymentInstruments": [metric]}
+                                        for name, metric in transactions],
+                })
+                shares = [rng.random() for _ in BRANDS]
+                total_users = rng.randint(100_000, 90_000_000)
+                app_opens = total_users * rng.randint(1, 40)
+                user_totals[year, quarter][0] += total_users
+                user_totals[year, quarter][1] += app_opens
+                _write(root, "aggregated/user", state, year, quarter, {
+                    "aggregated": {"registeredUsers": total_users, "appOpens": app_opens},
+                    "usersByDevice": [{"brand": brand, "count": int(total_users * share / sum(shares)),
+                                       "percentage": share / sum(shares)}
+                                      for brand, share in zip(BRANDS, shares)],
+                })
+                insurance = _metric(rng)
+                _add(period["insurance"]["type"], "Insurance", insurance)
+                _write(root, "aggregated/insurance", state, year, quarter, {
+                    "from": 0, "to": 0,
+                    "transactionData": [{"name": "Insurance", "paymentInstruments": [insurance]}],
+                })
+                district_transactions = [(name, _metric(rng)) for name in district_names]
+                for name, metric in district_transactions:
+                    _add(period["transaction"]["district"], name, metric)
+                    _add(period["transaction"]["state"], state, metric)
+                _write(root, "map/transaction/hover", state, year, quarter, {
+                    "hoverDataList": [{"name": name, "metric": [metric]} for name, metric in district_transactions],
+                })
+                district_users = {name: rng.randint(1_000, 5_000_000) for name in district_names}
+                for name, users in district_users.items():
+                    period["user"]["district"][name] = users
+                    period["user"]["state"][state] = period["user"]["state"].get(state, 0) + users
+                _write(root, "map/user/hover", state, year, quarter, {
+                    "hoverData": {name: {"registeredUsers": users, "appOpens": rng.randint(0, 100_000_000)}
+                                  for name, users in district_users.items()},
+                })
+                district_insurance = [(name, _metric(rng)) for name in district_names]
+                for name, metric in district_insurance:
+                    _add(period["insurance"]["district"], name, metric)
+                    _add(period["insurance"]["state"], state, metric)
+                _write(root, "map/insurance/hover", state, year, quarter, {
+                    "hoverDataList": [{"name": name, "metric": [metric]} for name, metric in district_insurance],
+                })
+                pincode_transactions = [(pin, _metric(rng)) for pin in pincode_names]
+                for pin, metric in pincode_transactions:
+                    _add(period["transaction"]["pincode"], pin, metric)
+                _write(root, "top/transaction", state, year, quarter, {
+                    "districts": [{"entityName": name, "metric": _metric(rng)} for name in district_names[:10]],
+                    "pincodes": [{"entityName": pin, "metric": metric} for pin, metric in pincode_transactions],
+                })
+                pincode_users = {pin: rng.randint(100, 500_000) for pin in pincode_names}
+                period["user"]["pincode"].update(pincode_users)
+                _write(root, "top/user", state, year, quarter, {
+                    "districts": [{"name": name, "registeredUsers": rng.randint(1_000, 5_000_000)}
+                                  for name in district_names[:10]],
+                    "pincodes": [{"name": pin, "registeredUsers": users} for pin, users in pincode_users.items()],
+                })
+                pincode_insurance = [(pin, _metric(rng)) for pin in pincode_names]
+                for pin, metric in pincode_insurance:
+                    _add(period["insurance"]["pincode"], pin, metric)
+                _write(root, "top/insurance", state, year, quarter, {
+                    "districts": [{"entityName": name, "metric": _metric(rng)} for name in district_names[:10]],
+                    "pincodes": [{"entityName": pin, "metric": metric} for pin, metric in pincode_insurance],
+                })
+                files += 9
+
+    for (year, quarter), period in sorted(national.items()):
+        _write(root, "aggregated/transaction", None, year, quarter, {
+            "from": 0, "to": 0,
+            "transactionData": [{"name": name, "paymentInstruments": [
+                {"type": "TOTAL", "count": count, "amount": round(amount, 2)}]}
+                for name, (count, amount) in period["transaction"]["type"].items()],
+        })
+        registered_users, app_opens = user_totals[year, quarter]
+        _write(root, "aggregated/user", None, year, quarter, {
+            "aggregated": {"registeredUsers": registered_users, "appOpens": app_opens},
+            "usersByDevice": None,
+        })
+        _write(root, "aggregated/insurance", None, year, quarter, {
+            "from": 0, "to": 0,
+            "transactionData": [{"name": name, "paymentInstruments": [
+                {"type": "TOTAL", "count": count, "amount": round(amount, 2)}]}
+                for name, (count, amount) in period["insurance"]["type"].items()],
+        })
+        for dataset in ("transaction", "insurance"):
+            _write(root, f"top/{dataset}", None, year, quarter, {
+                level: _top_metric(period[dataset][level[:-1]]) for level in ("states", "districts", "pincodes")
+            })
+        _write(root, "top/user", None, year, quarter, {
+            level: _top_users(period["user"][level[:-1]]) for level in ("states", "districts", "pincodes")
+        })
+        files += 6
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="directory to create (the equivalent of pulse-main/data)")
+    parser.add_argument("--states", type=int, default=36)
+    parser.add_argument("--districts", type=int, default=20, help="districts per state")
+    parser.add_argument("--pincodes", type=int, default=10, help="top pincodes per state")
+    parser.add_argument("--years", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    files = generate(args.out, args.states, args.districts, args.pincodes, args.years, seed=args.seed)
+    print(f"✅ Wrote {files} files to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
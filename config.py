@@ -0,0 +1,21 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ================= DATABASE SETTINGS =================
+# Shared by loader.py and app.py; values come from .env
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "phonepe_pulse"),
+}
+
+# "mysql" or "parquet" (DuckDB over the loader's Parquet snapshot, see snapshot.py)
+BACKEND = os.getenv("PULSE_BACKEND", "mysql")
+
+# Pulse data for the loader: the pulse-main/data directory or the repository archive
+DATA_ROOT = os.getenv("PHONEPE_PATH", "pulse-main/data")
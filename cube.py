@@ -0,0 +1,338 @@
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from geo import match_key
+from instrument import span
+
+# ================= IN-PROCESS CUBE =================
+# Every Home and Analysis view sums one metric over a subset of (state,
+# year, quarter, type / brand / district). The fact tables behind them are
+# small enough to hold whole, so each is loaded once per process into
+# dense NumPy arrays: one axis per dimension, indexed by integer codes for
+# the sorted distinct labels. A view is then an index, a sum over axes and
+# maybe a sort, on arrays already in memory, with no query at all.
+#
+# Metric arrays hold 0 where no fact row exists; `present` marks the cells
+# that do, so a sum over nothing comes out NaN, like SQL's NULL.
+
+# `optional` sources may be missing (loaded before the loader read them);
+# they then come up as empty cubes
+CubeSource = namedtuple("CubeSource", ["table", "dims", "metrics", "optional"], defaults=[False])
+
+CUBE_SOURCES = [
+    CubeSource("aggregated_transaction", ["States", "Years", "Quarter", "Transaction_type"],
+               ["Transaction_count", "Transaction_amount"]),
+    CubeSource("aggregated_insurance", ["States", "Years", "Quarter", "Insurance_type"],
+               ["Insurance_count", "Insurance_amount"]),
+    CubeSource("aggregated_user", ["States", "Years", "Quarter", "Brands"], ["Transaction_count"]),
+    CubeSource("map_user", ["States", "Years", "Quarter", "Districts"], ["RegisteredUser", "AppOpens"]),
+    # upstream's all-India figures from the country-level files
+    CubeSource("national_transaction", ["Years", "Quarter", "Transaction_type"],
+               ["Transaction_count", "Transaction_amount"], optional=True),
+    CubeSource("national_insurance", ["Years", "Quarter", "Insurance_type"],
+               ["Insurance_count", "Insurance_amount"], optional=True),
+    CubeSource("national_user", ["Years", "Quarter"], ["RegisteredUser", "AppOpens"], optional=True),
+]
+
+
+def source_sql(source):
+    return f"SELECT {', '.join(source.dims + source.metrics)} FROM {source.table}"
+
+
+class Cube:
+    """One fact table as dense arrays over its dimensions.
+
+    Filters are passed as keyword arguments naming a dimension and one of
+    its labels (Years=2023, States="karnataka"); `by` names the dimensions
+    kept in the result, in that order. Every other dimension is summed.
+    `map_labels` holds each state's geo.match_key(), the name the map
+    joins on, normalized once here rather than on every view.
+    """
+
+    def __init__(self, frame, dims, metrics):
+        self.dims = list(dims)
+        self.labels = {}
+        self._positions = {}
+        codes = []
+        for dim in self.dims:
+            categorical = pd.Categorical(frame[dim])
+            self.labels[dim] = np.asarray(categorical.categories)
+            self._positions[dim] = {label: i for i, label in enumerate(self.labels[dim])}
+            codes.append(categorical.codes)
+        self.map_labels = dict(self.labels)
+        if "States" in self.labels:
+            self.map_labels["States"] = np.array([match_key(str(state)) for state in self.labels["States"]],
+                                                 dtype=object)
+        shape = tuple(len(self.labels[dim]) for dim in self.dims)
+        cells = tuple(codes)
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[cells] = True
+        self.values = {}
+        for metric in metrics:
+            values = np.zeros(shape)
+            values[cells] = pd.to_numeric(frame[metric]).fillna(0).to_numpy(dtype=float)
+            self.values[metric] = values
+
+    def _index(self, where):
+        """Index fixing each filtered dimension to its label; None if a label is unknown."""
+        index = []
+        for dim in self.dims:
+            if dim not in where:
+                index.append(slice(None))
+                continue
+            position = self._positions[dim].get(where[dim])
+            if position is None:
+                return None
+            index.append(position)
+        return tuple(index)
+
+    def slice(self, metric, **where):
+        """(remaining dims, values, present) with the filtered dimensions fixed."""
+        unknown = set(where) - set(self.dims)
+        if unknown:
+            raise KeyError(f"Unknown dimensions {sorted(unknown)}, expected some of {self.dims}")
+        dims = [dim for dim in self.dims if dim not in where]
+        index = self._index(where)
+        if index is None:
+            shape = tuple(len(self.labels[dim]) for dim in dims)
+            return dims, np.zeros(shape), np.zeros(shape, dtype=bool)
+        return dims, self.values[metric][index], self.present[index]
+
+    def sum(self, metric, by=(), fill=np.nan, **where):
+        """Sum of `metric` over every dimension not in `by` or `where`.
+
+        Returns an array with one axis per `by` dimension (a float when `by`
+        is empty); cells with no fact rows are `fill`.
+        """
+        dims, values, present = self.slice(metric, **where)
+        axes = tuple(i for i, dim in enumerate(dims) if dim not in by)
+        kept = [dim for dim in dims if dim in by]
+        totals = values.sum(axis=axes)
+        totals = np.where(present.any(axis=axes), totals, fill)
+        totals = np.transpose(totals, [kept.index(dim) for dim in by])
+        return totals.item() if not by else totals
+
+    def yoy(self, metric, by=("Years",), **where):
+        """Percent growth of the yearly sums over the previous year, along the Years axis.
+
+        NaN for the first year, after a gap in the years, or when the
+        previous year is missing or zero.
+        """
+        totals = self.sum(metric, by=by, **where)
+        axis = list(by).index("Years")
+        totals = np.moveaxis(totals, axis, 0)
+        years = self.labels["Years"]
+        growth = np.full(totals.shape, np.nan)
+        previous = totals[:-1]
+        consecutive = (np.diff(years) == 1).reshape((-1,) + (1,) * (totals.ndim - 1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = 100 * (totals[1:] - previous) / previous
+        growth[1:] = np.where(consecutive & (previous != 0), rate, np.nan)
+        return np.moveaxis(growth, 0, axis)
+
+    def topk(self, metric, by, k, **where):
+        """The `k` largest sums as (labels tuple, value), largest first; ties in label order."""
+        totals = self.sum(metric, by=by, **where)
+        flat = totals.ravel()
+        candidates = np.flatnonzero(~np.isnan(flat))
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-flat[candidates], k - 1)[:k]]
+            # argpartition does not keep ties together; pull in any equal to the kth value
+            cutoff = flat[candidates].min()
+            candidates = np.flatnonzero(flat >= cutoff)
+        order = np.lexsort((candidates, -flat[candidates]))[:k]
+        cells = np.unravel_index(candidates[order], totals.shape)
+        return [(tuple(self.labels[dim][cell[i]] for dim, cell in zip(by, cells)), flat[candidates[order][i]])
+                for i in range(len(order))]
+
+    def frame(self, metrics, by, yoy=False, map_labels=False, **where):
+        """DataFrame of `metrics` summed by the `by` dimensions, one row per
+        combination with any data; with yoy=True also {metric}_yoy columns,
+        and with map_labels=True states named by their map match key."""
+        columns = {metric: self.sum(metric, by=by, **where) for metric in metrics}
+        if yoy:
+            columns.update({f"{metric}_yoy": self.yoy(metric, by=by, **where) for metric in metrics})
+        labels = self.map_labels if map_labels else self.labels
+        grid = np.meshgrid(*(labels[dim] for dim in by), indexing="ij")
+        keep = np.zeros(grid[0].shape, dtype=bool)
+        for metric in metrics:
+            keep |= ~np.isnan(columns[metric])
+        data = {dim: labels[keep] for dim, labels in zip(by, grid)}
+        data.update({name: values[keep] for name, values in columns.items()})
+        return pd.DataFrame(data)
+
+
+# ================= DASHBOARD VIEWS =================
+# The frames app.py used to query, by name, with the same columns.
+
+def _home_states(cubes, table, value_column, count_column, year, quarter=None):
+    where = {"Years": year} if quarter is None else {"Years": year, "Quarter": quarter}
+    return cubes[table].frame([value_column, count_column], by=("States",), map_labels=True, **where)
+
+
+def _national_totals(cubes, table, state_table, metrics, year, quarter=None):
+    """One row of all-India totals, read from the country-level figures; a
+    period those files don't cover is summed over the states instead."""
+    where = {"Years": year} if quarter is None else {"Years": year, "Quarter": quarter}
+    totals = {metric: cubes[table].sum(metric, **where) for metric in metrics}
+    if any(np.isnan(value) for value in totals.values()):
+        totals = {metric: cubes[state_table].sum(metric, fill=0, **where) for metric in metrics}
+    return pd.DataFrame([totals])
+
+
+def _top_districts(cubes, year, quarter=None, limit=10):
+    where = {"Years": year} if quarter is None else {"Years": year, "Quarter": quarter}
+    top = cubes["map_user"].topk("RegisteredUser", ("States", "Districts"), limit, **where)
+    return pd.DataFrame([(state, district, value) for (state, district), value in top],
+                        columns=["States", "Districts", "TotalUsers"])
+
+
+def _yearly(cubes, table, columns, state):
+    """Per-year sums (and YoY growth) for one state, renamed as `columns` says."""
+    df = cubes[table].frame(list(columns)[:2], by=("Years",), yoy=True, States=state)
+    return df.rename(columns=columns)[["Years"] + list(columns.values())]
+
+
+def _transaction_yearly(cubes, state):
+    return _yearly(cubes, "aggregated_transaction", {
+        "Transaction_count": "total_transactions", "Transaction_amount": "total_amount",
+        "Transaction_count_yoy": "transaction_growth", "Transaction_amount_yoy": "amount_growth",
+    }, state)
+
+
+def _insurance_yearly(cubes, state):
+    return _yearly(cubes, "aggregated_insurance", {
+        "Insurance_count": "total_policies", "Insurance_amount": "total_amount",
+        "Insurance_count_yoy": "policy_growth", "Insurance_amount_yoy": "amount_growth",
+    }, state)
+
+
+def _user_engagement_yearly(cubes, state):
+    df = cubes["map_user"].frame(["RegisteredUser", "AppOpens"], by=("Years",), States=state)
+    df = df.rename(columns={"RegisteredUser": "total_users", "AppOpens": "total_opens"})
+    df["opens_per_user"] = df["total_opens"] / df["total_users"].replace(0, np.nan)
+    return df
+
+
+def _transaction_categories(cubes, state):
+    df = cubes["aggregated_transaction"].frame(["Transaction_count", "Transaction_amount"],
+                                               by=("Transaction_type",), States=state)
+    return df.rename(columns={"Transaction_count": "total_count", "Transaction_amount": "total_amount"})
+
+
+def _transaction_type_year(cubes, state):
+    df = cubes["aggregated_transaction"].frame(["Transaction_amount"], by=("Years", "Transaction_type"),
+                                               States=state)
+    return df.rename(columns={"Transaction_amount": "total_amount"})
+
+
+def _device_brands(cubes, state):
+    cube = cubes["aggregated_user"]
+    users = cube.sum("Transaction_count", by=("Years", "Brands"), States=state)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = 100 * users / np.nansum(users, axis=1, keepdims=True)
+    keep = ~np.isnan(users)
+    years, brands = np.meshgrid(cube.labels["Years"], cube.labels["Brands"], indexing="ij")
+    return pd.DataFrame({"Years": years[keep], "Brands": brands[keep],
+                         "total_users": users[keep], "percentage": share[keep]})
+
+
+VIEWS = {
+    "home_states": _home_states,
+    "national_totals": _national_totals,
+    "top_districts": _top_districts,
+    "transaction_yearly": _transaction_yearly,
+    "transaction_categories": _transaction_categories,
+    "transaction_type_year": _transaction_type_year,
+    "device_brands": _device_brands,
+    "insurance_yearly": _insurance_yearly,
+    "user_engagement_yearly": _user_engagement_yearly,
+}
+
+
+class CubeSet:
+    """Cubes for every table in CUBE_SOURCES, built from one data version."""
+
+    def __init__(self, cubes, version):
+        self.cubes = cubes
+        self.version = version
+
+    def __getitem__(self, table):
+        return self.cubes[table]
+
+    def view(self, name, **values):
+        with span("cube", name=name) as s:
+            df = VIEWS[name](self, **values)
+            s.set(rows=len(df))
+        return df
+
+
+def build_cubes(read, version):
+    """Load every CUBE_SOURCES table with read(sql) -> DataFrame into a CubeSet."""
+    cubes = {}
+    for source in CUBE_SOURCES:
+        with span("cube.build", table=source.table) as s:
+            try:
+                frame = read(source_sql(source))
+            except Exception as e:
+                if not source.optional:
+                    raise
+                print(f"⚠️ {source.table} not available, leaving its cube empty: {e}")
+                frame = pd.DataFrame(columns=source.dims + source.metrics)
+            cubes[source.table] = Cube(frame, source.dims, source.metrics)
+            s.set(rows=len(frame))
+    return CubeSet(cubes, version)
+
+
+# ================= REFRESH =================
+class CubeStore:
+    """The process-wide CubeSet, rebuilt off the script thread on new data.
+
+    The first call builds the cubes in the foreground. After that, at most
+    every `check_seconds` a caller looks up the latest data version; when
+    it changed, a background thread builds a new CubeSet and swaps it in,
+    and readers keep using the current one until then.
+    """
+
+    def __init__(self, check_seconds):
+        self.check_seconds = check_seconds
+        self.current = None
+        self.checked = 0.0
+        self._lock = threading.Lock()
+        self._refresh = None
+
+    def get(self, latest_version, read):
+        """The current CubeSet; `latest_version()` and `read(sql)` are called as needed."""
+        if self.current is None:
+            with self._lock:
+                if self.current is None:
+                    self.checked = time.monotonic()
+                    version = latest_version()
+                    self.current = build_cubes(read, version)
+            return self.current
+        now = time.monotonic()
+        if now - self.checked >= self.check_seconds:
+            self.checked = now
+            version = latest_version()
+            if version != self.current.version:
+                self._start_refresh(read, version)
+        return self.current
+
+    def _start_refresh(self, read, version):
+        with self._lock:
+            if self._refresh is not None and self._refresh.is_alive():
+                return
+            self._refresh = threading.Thread(target=self._rebuild, args=(read, version),
+                                             name="pulse-cube-refresh", daemon=True)
+            self._refresh.start()
+
+    def _rebuild(self, read, version):
+        try:
+            self.current = build_cubes(read, version)
+        except Exception as e:
+            # keep serving the old cubes; the next version check retries
+            print(f"⚠️ Cube refresh failed: {e}")
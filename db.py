@@ -0,0 +1,335 @@
+import os
+import time
+import weakref
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+import mysql.connector
+import streamlit as st
+from mysql.connector import FieldType, errorcode, pooling
+from mysql.connector.errors import DatabaseError, PoolError
+
+from config import BACKEND, DB_CONFIG
+from cube import CubeStore
+from export import EXPORT_CHUNK_ROWS, EXPORT_DIR, export_name, export_query, write_export
+from instrument import span
+from queries import bind
+from rollups import LEADERBOARD_SIZE
+from schema import compact_frame
+from snapshot import SNAPSHOT_DIR, column_type, connect_snapshot, snapshot_version
+
+# ================= SETTINGS =================
+POOL_SIZE = 8
+POOL_WAIT_SECONDS = 10          # how long a rerun waits for a free pooled connection
+CACHE_TTL_SECONDS = 600
+CACHE_MAX_ENTRIES = 256
+VERSION_CHECK_SECONDS = 30      # how often to look for a newer loader run
+
+
+# ================= CONNECTION POOL =================
+@st.cache_resource
+def get_pool():
+    # one pool per Streamlit server process, shared by every session. Sessions
+    # are not reset on checkin: that would deallocate the prepared statements
+    # below, and the dashboard sets no session state worth clearing. The
+    # dashboard only reads, so it autocommits: a connection left inside an
+    # open REPEATABLE READ transaction would keep answering from its first
+    # snapshot and never see the loader's newer runs.
+    return pooling.MySQLConnectionPool(pool_name="pulse", pool_size=POOL_SIZE, pool_reset_session=False,
+                                       autocommit=True, **DB_CONFIG)
+
+
+@contextmanager
+def get_connection(pool=None):
+    """Borrow a pooled connection; closing it hands it back to the pool."""
+    if pool is None:
+        pool = get_pool()
+    deadline = time.monotonic() + POOL_WAIT_SECONDS
+    with span("db.connect"):
+        while True:
+            try:
+                conn = pool.get_connection()
+                break
+            except PoolError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+# ================= PREPARED STATEMENTS =================
+# Each pooled connection keeps one server-side prepared cursor per statement
+# text, so a query is parsed and planned once per connection and every later
+# run only ships its parameters. Statements belong to the underlying
+# connection (the pooled wrapper is new on every checkout) and are dropped
+# when it reconnects, which gives it a new connection id.
+_statements = weakref.WeakKeyDictionary()
+_statements_lock = threading.Lock()
+
+
+def _prepared_cursors(conn):
+    raw = getattr(conn, "_cnx", conn)
+    with _statements_lock:
+        connection_id, cursors = _statements.get(raw, (None, None))
+        if cursors is None or connection_id != raw.connection_id:
+            cursors = {}
+            _statements[raw] = (raw.connection_id, cursors)
+    return cursors
+
+
+def _read_prepared(conn, sql, params):
+    cursors = _prepared_cursors(conn)
+    cursor = cursors.get(sql)
+    if cursor is None:
+        cursor = cursors[sql] = conn.cursor(prepared=True)
+    try:
+        cursor.execute(sql, params)
+    except DatabaseError as e:
+        if e.errno != errorcode.ER_UNKNOWN_STMT_HANDLER:
+            raise
+        # the server forgot the statement (e.g. it was restarted): prepare it again
+        cursor = cursors[sql] = conn.cursor(prepared=True)
+        cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    columns = [column[0] for column in cursor.description]
+    # coerce_float turns SUM()'s Decimals into floats, as pd.read_sql did
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+# ================= PARQUET BACKEND =================
+@st.cache_resource
+def get_snapshot(version):
+    # keyed on the snapshot version so a newly published snapshot gets a fresh connection
+    return connect_snapshot(SNAPSHOT_DIR)
+
+
+def _read_snapshot(sql, params, snapshot):
+    # DuckDB connections are not thread-safe; cursor() gives each query its own
+    cursor = snapshot.cursor()
+    try:
+        return cursor.execute(sql.replace("%s", "?"), list(params)).df()
+    finally:
+        cursor.close()
+
+
+# ================= READS =================
+def _source():
+    """The pool or snapshot connection to read from, resolved on the script
+    thread so the background cube refresh never calls into Streamlit's caches."""
+    if BACKEND == "parquet":
+        return get_snapshot(snapshot_version(SNAPSHOT_DIR))
+    return get_pool()
+
+
+def _fetch(sql, params, source):
+    if BACKEND == "parquet":
+        with span("query.duckdb"):
+            df = _read_snapshot(sql, params, source)
+    else:
+        with get_connection(source) as conn, span("query.prepared"):
+            df = _read_prepared(conn, sql, params)
+    return compact_frame(df)
+
+
+# ================= QUERY CACHE =================
+class QueryCache:
+    """Size-bounded LRU of query results with a TTL, shared across sessions."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = None
+        self.version_checked = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@st.cache_resource
+def get_query_cache():
+    return QueryCache()
+
+
+def normalize_sql(sql):
+    return " ".join(sql.split()).rstrip(";").strip()
+
+
+def _latest_load_run():
+    if BACKEND == "parquet":
+        return snapshot_version(SNAPSHOT_DIR)
+    with get_connection() as conn:
+        return _latest_mysql_run(conn)
+
+
+def _latest_mysql_run(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(Run_id) FROM load_runs")
+        return cursor.fetchone()[0]
+    except Exception:
+        # databases loaded before load_runs existed simply never invalidate
+        return None
+    finally:
+        cursor.close()
+
+
+def _check_data_version(cache):
+    """Drop every cached result once the loader has recorded a newer run."""
+    now = time.monotonic()
+    if now - cache.version_checked < VERSION_CHECK_SECONDS:
+        return
+    cache.version_checked = now
+    version = _latest_load_run()
+    if version != cache.version:
+        cache.clear()
+        cache.version = version
+
+
+def run_query(sql, params=(), name=None):
+    """Run a SELECT through the pool and the shared result cache.
+
+    Returns a copy of the cached frame, so callers may add columns freely.
+    A cache hit never touches the database.
+    """
+    cache = get_query_cache()
+    _check_data_version(cache)
+    key = (normalize_sql(sql), tuple(params))
+    with span("query", name=name or key[0][:60]) as s:
+        df = cache.get(key)
+        s.set(cache="hit" if df is not None else "miss")
+        if df is None:
+            df = _fetch(sql, params, _source())
+            cache.put(key, df)
+        s.set(rows=len(df))
+        return df.copy()
+
+
+def run_named(name, **values):
+    """run_query for a query defined in queries.py."""
+    sql, params = bind(name, **values)
+    return run_query(sql, params, name=name)
+
+
+def top_entities(level, metric, year, quarter=0, state="", limit=LEADERBOARD_SIZE):
+    """Top `limit` districts or pincodes by `metric` from the loader's leaderboard.
+
+    quarter=0 ranks whole years and state="" ranks all of India; any
+    combination is one primary-key range read. Returns Position, Entity,
+    Entity_state and Value.
+    """
+    return run_named("leaderboard", year=year, quarter=quarter, state=state, level=level,
+                     metric=metric, limit=limit)
+
+
+# ================= CUBE =================
+@st.cache_resource
+def get_cube_store():
+    return CubeStore(check_seconds=VERSION_CHECK_SECONDS)
+
+
+def get_cubes():
+    """The process-wide in-memory cubes (cube.py), shared by every session.
+
+    Built on first use; after the loader records a new run they are rebuilt
+    in the background while readers keep using the previous set.
+    """
+    source = _source()
+    return get_cube_store().get(_latest_load_run, lambda sql: _fetch(sql, (), source))
+
+
+# ================= EXPORT =================
+def _chunks(cursor, chunk_rows):
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+
+_MYSQL_INT_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG, FieldType.LONGLONG,
+                    FieldType.YEAR}
+_MYSQL_FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE}
+
+
+def _mysql_column_type(type_code):
+    if type_code in _MYSQL_INT_TYPES:
+        return "int64"
+    return "float64" if type_code in _MYSQL_FLOAT_TYPES else "string"
+
+
+@contextmanager
+def stream_query(sql, params=(), chunk_rows=EXPORT_CHUNK_ROWS):
+    """(column names, column types, iterator of row chunks) for a SELECT,
+    never the whole result.
+
+    On MySQL the query runs on its own connection through an unbuffered
+    cursor, so rows stay on the server until fetchmany() asks for the next
+    chunk, and a long export doesn't hold one of the dashboard's pooled
+    connections. On the Parquet backend DuckDB hands rows out in chunks the
+    same way. Types are Arrow type names, from the cursor's description on
+    MySQL and from the snapshot's own typing by column name on Parquet.
+    """
+    if BACKEND == "parquet":
+        cursor = _source().cursor()
+        try:
+            cursor.execute(sql.replace("%s", "?"), list(params))
+            columns = [column[0] for column in cursor.description]
+            yield columns, [column_type(name) for name in columns], _chunks(cursor, chunk_rows)
+        finally:
+            cursor.close()
+        return
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(sql, params)
+        yield ([column[0] for column in cursor.description],
+               [_mysql_column_type(column[1]) for column in cursor.description], _chunks(cursor, chunk_rows))
+    finally:
+        # closing the connection also discards any rows left unread
+        conn.close()
+
+
+def export_table(table, fmt, year=None, quarter=None, state=None):
+    """Export a fact table's rows for the given filters (None = any) to
+    EXPORT_DIR as CSV or Parquet; returns the file name.
+
+    Memory stays flat whatever the size: rows go from the cursor to the file
+    a chunk at a time. An export of the same filters and data version is
+    served from the file already written.
+    """
+    sql, params = export_query(table, year=year, quarter=quarter, state=state)
+    name = export_name(table, fmt, _latest_load_run(), year=year, quarter=quarter, state=state)
+    path = os.path.join(EXPORT_DIR, name)
+    with span("export", table=table, format=fmt) as s:
+        s.set(cache="hit" if os.path.exists(path) else "miss")
+        if not os.path.exists(path):
+            with stream_query(sql, params) as (columns, types, chunks):
+                s.set(rows=write_export(path, fmt, columns, types, chunks))
+    return name
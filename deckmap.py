@@ -0,0 +1,133 @@
+import json
+
+import pydeck as pdk
+
+from geo import DISTRICT_KEY, STATE_KEY, match_key, match_state
+
+# ================= HOME CHOROPLETH =================
+# The Home map is one GeoJsonLayer whose polygons never change; only each
+# state's value, color and elevation depend on the selected view. The
+# polygons are serialized to JSON once per process and every view's
+# payload is spliced together from those strings, so a new view encodes
+# just the per-state properties and a repeated view reuses the whole
+# serialized deck. A state's district drill-down map is built the same way
+# from that state's district polygons.
+
+VIEW_STATE = pdk.ViewState(latitude=22.9734, longitude=78.6569, zoom=4, pitch=45, bearing=0)
+TOOLTIP = {
+    "html": "<b>State:</b> {ST_NM} <br/> <b>Value:</b> {value}",
+    "style": {"backgroundColor": "white", "color": "black"}
+}
+DISTRICT_TOOLTIP = {
+    "html": "<b>District:</b> {DISTRICT} <br/> <b>Value:</b> {value}",
+    "style": {"backgroundColor": "white", "color": "black"}
+}
+MAX_ELEVATION = 500000
+LAYER_ID = "home-choropleth"
+DISTRICT_LAYER_ID = "district-choropleth"
+_DATA_PLACEHOLDER = "__pulse_choropleth_features__"
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+class PrebuiltDeck(pdk.Deck):
+    """A Deck whose JSON was serialized ahead of time.
+
+    st.pydeck_chart sends whatever to_json() returns, so this skips
+    pydeck's serialization entirely. Pass the same tooltip the JSON was
+    built with: Streamlit reads it from the Deck object separately.
+    """
+
+    def __init__(self, deck_json, **kwargs):
+        super().__init__(**kwargs)
+        self._deck_json = deck_json
+
+    def to_json(self):
+        return self._deck_json
+
+
+class ChoroplethTemplate:
+    """State polygons pre-serialized, ready to be colored per view.
+
+    Values are joined on geo.match_key() of the `key` feature property, the
+    same key click matching uses. With prefix_match a feature whose key has
+    no value takes the value of a name extending it (or one it extends), as
+    geo.match_state() does for long state names. See district_template()
+    for a state's drill-down map.
+    """
+
+    def __init__(self, geojson, key=STATE_KEY, view_state=VIEW_STATE, tooltip=TOOLTIP,
+                 layer_id=LAYER_ID, max_elevation=MAX_ELEVATION, prefix_match=True):
+        self._key = key
+        self._view_state = view_state
+        self._tooltip = tooltip
+        self._max_elevation = max_elevation
+        self._prefix_match = prefix_match
+        self._features = [(_dumps(feature["geometry"]), feature["properties"],
+                           match_key(feature["properties"][key]) if feature["properties"].get(key) else None)
+                          for feature in geojson["features"]]
+        layer = pdk.Layer(
+            "GeoJsonLayer",
+            data=_DATA_PLACEHOLDER,
+            id=layer_id,
+            get_fill_color="properties.color",
+            get_elevation="properties.elevation",
+            extruded=True,
+            pickable=True,
+            auto_highlight=True,
+            stroked=True,
+            filled=True,
+            get_line_color=[255, 255, 255],
+            line_width_min_pixels=1,
+        )
+        deck_json = pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip).to_json()
+        self._deck_prefix, self._deck_suffix = deck_json.split(_dumps(_DATA_PLACEHOLDER), 1)
+
+    def __len__(self):
+        return len(self._features)
+
+    def _value(self, state_values, feature_key):
+        if feature_key in state_values or not self._prefix_match:
+            return state_values.get(feature_key, 0)
+        name = match_state(feature_key, state_values)
+        return 0 if name is None else state_values[name]
+
+    def features_json(self, state_values):
+        """FeatureCollection JSON colored and extruded by {match_key(state or district name): value}."""
+        max_value = max(state_values.values()) if state_values else 1
+        max_value = max_value or 1
+        parts = []
+        for geometry_json, properties, feature_key in self._features:
+            props = dict(properties)
+            if feature_key:
+                amount = float(self._value(state_values, feature_key))
+                norm = amount / max_value
+                props["value"] = amount
+                props["color"] = [255, int(255 * (1 - norm)), int(255 * (1 - norm))]
+                props["elevation"] = norm * self._max_elevation
+            parts.append(f'{{"type":"Feature","geometry":{geometry_json},"properties":{_dumps(props)}}}')
+        return '{"type":"FeatureCollection","features":[' + ",".join(parts) + "]}"
+
+    def deck_json(self, state_values):
+        """Complete deck JSON for st.pydeck_chart (wrap it in a PrebuiltDeck)."""
+        return self._deck_prefix + self.features_json(state_values) + self._deck_suffix
+
+    def keys(self):
+        """The match keys of every feature, e.g. of each district's name."""
+        return {feature_key for _, _, feature_key in self._features if feature_key}
+
+    def deck(self, deck_json):
+        return PrebuiltDeck(deck_json, initial_view_state=self._view_state, tooltip=self._tooltip)
+
+
+def district_template(geojson, view):
+    """ChoroplethTemplate for one state's districts, framed by a
+    (longitude, latitude, zoom) view from geo.fit_view()."""
+    longitude, latitude, zoom = view
+    view_state = pdk.ViewState(latitude=latitude, longitude=longitude, zoom=zoom, pitch=45, bearing=0)
+    # columns as tall relative to the state as the Home map's are to India
+    max_elevation = MAX_ELEVATION / 2 ** (zoom - VIEW_STATE.zoom)
+    return ChoroplethTemplate(geojson, key=DISTRICT_KEY, view_state=view_state, tooltip=DISTRICT_TOOLTIP,
+                              layer_id=DISTRICT_LAYER_ID, max_elevation=max_elevation, prefix_match=False)
@@ -0,0 +1,377 @@
+import os
+import json
+from typing import Dict, List, Optional
+
+# ================= PULSE FILE DECODERS =================
+# One decoder per Pulse file kind, turning the raw bytes of a quarter file
+# straight into the dataset-specific part of each row; the loader prepends
+# (state, year, quarter).
+#
+# With msgspec installed, files are decoded into typed structs that only
+# materialize the fields we use and validate them on the way in. Otherwise
+# orjson (or the stdlib json module) parses the document and the same
+# fields are read from plain dicts. PULSE_JSON_DECODER=msgspec|orjson|json
+# forces a backend.
+#
+# Any problem with a file's contents raises PulseFormatError naming the file
+# and the offending field, instead of a bare KeyError halfway through a run.
+
+
+class PulseFormatError(ValueError):
+    def __init__(self, path, message):
+        super().__init__(f"{path}: {message}")
+        self.path = path
+
+
+def _pick_backend():
+    wanted = os.getenv("PULSE_JSON_DECODER")
+    for name in ([wanted] if wanted else ["msgspec", "orjson", "json"]):
+        try:
+            __import__(name)
+            return name
+        except ImportError:
+            if wanted:
+                raise
+    return "json"
+
+
+JSON_BACKEND = _pick_backend()
+
+if JSON_BACKEND == "orjson":
+    import orjson
+    _loads = orjson.loads
+else:
+    _loads = json.loads
+
+
+# ================= DICT EXTRACTORS =================
+# Used by the orjson/json backends; they mirror the loader's original field access.
+def extract_agg_transaction(data):
+    for d in data["data"]["transactionData"] or []:
+        yield d["name"], d["paymentInstruments"][0]["count"], d["paymentInstruments"][0]["amount"]
+
+
+def extract_agg_user(data):
+    for d in data["data"]["usersByDevice"] or []:
+        yield d["brand"], d["count"], d["percentage"]
+
+
+def extract_map_transaction(data):
+    for d in data["data"]["hoverDataList"] or []:
+        yield d["name"], d["metric"][0]["count"], d["metric"][0]["amount"]
+
+
+def extract_map_user(data):
+    for district, info in data["data"]["hoverData"].items():
+        yield district, info["registeredUsers"], info["appOpens"]
+
+
+def extract_top_transaction(data):
+    for d in data["data"]["pincodes"] or []:
+        yield d["entityName"], d["metric"]["count"], d["metric"]["amount"]
+
+
+def extract_top_user(data):
+    for d in data["data"]["pincodes"] or []:
+        yield d["name"], d["registeredUsers"]
+
+
+def extract_agg_insurance(data):
+    for d in (data.get("data") or {}).get("transactionData", []) or []:
+        instruments = d.get("paymentInstruments")
+        count = instruments[0]["count"] if instruments else 0
+        amount = instruments[0]["amount"] if instruments else 0
+        yield d.get("name", "Unknown"), count, amount
+
+
+def extract_map_insurance(data):
+    if not data["data"] or "hoverDataList" not in data["data"]:
+        return
+    for d in data["data"]["hoverDataList"] or []:
+        count = d["metric"][0]["count"] if d.get("metric") else 0
+        amount = d["metric"][0]["amount"] if d.get("metric") else 0
+        yield d.get("name", "Unknown"), count, amount
+
+
+def extract_top_insurance(data):
+    if not data["data"]:
+        return
+    for d in data["data"].get("pincodes", []) or []:
+        count = d["metric"]["count"] if d.get("metric") else 0
+        amount = d["metric"]["amount"] if d.get("metric") else 0
+        yield d.get("entityName", "Unknown"), count, amount
+
+
+# ---- Country-level files (country/india/<year>/<quarter>.json) ----
+TOP_LISTS = [("state", "states"), ("district", "districts"), ("pincode", "pincodes")]
+
+
+def extract_agg_user_totals(data):
+    totals = data["data"]["aggregated"]
+    yield totals["registeredUsers"], totals["appOpens"]
+
+
+def extract_top_transaction_lists(data):
+    for level, key in TOP_LISTS:
+        for d in data["data"].get(key) or []:
+            yield level, d["entityName"], d["metric"]["count"], d["metric"]["amount"]
+
+
+def extract_top_user_lists(data):
+    for level, key in TOP_LISTS:
+        for d in data["data"].get(key) or []:
+            yield level, d["name"], d["registeredUsers"]
+
+
+def extract_top_insurance_lists(data):
+    if not data["data"]:
+        return
+    for level, key in TOP_LISTS:
+        for d in data["data"].get(key) or []:
+            count = d["metric"]["count"] if d.get("metric") else 0
+            amount = d["metric"]["amount"] if d.get("metric") else 0
+            yield level, d.get("entityName", "Unknown"), count, amount
+
+
+EXTRACTORS = {
+    "agg_transaction": extract_agg_transaction,
+    "agg_user": extract_agg_user,
+    "agg_insurance": extract_agg_insurance,
+    "map_transaction": extract_map_transaction,
+    "map_user": extract_map_user,
+    "map_insurance": extract_map_insurance,
+    "top_transaction": extract_top_transaction,
+    "top_user": extract_top_user,
+    "top_insurance": extract_top_insurance,
+    "agg_user_totals": extract_agg_user_totals,
+    "top_transaction_lists": extract_top_transaction_lists,
+    "top_user_lists": extract_top_user_lists,
+    "top_insurance_lists": extract_top_insurance_lists,
+}
+
+
+# ================= TYPED DECODERS (msgspec) =================
+def _build_struct_decoders():
+    from msgspec import Struct, json as msgjson
+
+    class Metric(Struct):
+        count: int
+        amount: float
+
+    class OptionalMetric(Struct):
+        count: int = 0
+        amount: float = 0
+
+    class TransactionEntry(Struct):
+        name: str
+        paymentInstruments: List[Metric]
+
+    class TransactionData(Struct):
+        transactionData: Optional[List[TransactionEntry]] = None
+
+    class TransactionFile(Struct):
+        data: TransactionData
+
+    class DeviceEntry(Struct):
+        brand: str
+        count: int
+        percentage: float
+
+    class UserData(Struct):
+        usersByDevice: Optional[List[DeviceEntry]] = None
+
+    class UserFile(Struct):
+        data: UserData
+
+    class InsuranceEntry(Struct):
+        name: str = "Unknown"
+        paymentInstruments: Optional[List[OptionalMetric]] = None
+
+    class InsuranceData(Struct):
+        transactionData: Optional[List[InsuranceEntry]] = None
+
+    class InsuranceFile(Struct):
+        data: Optional[InsuranceData] = None
+
+    class HoverEntry(Struct):
+        name: str
+        metric: List[Metric]
+
+    class HoverData(Struct):
+        hoverDataList: Optional[List[HoverEntry]] = None
+
+    class HoverFile(Struct):
+        data: HoverData
+
+    class InsuranceHoverEntry(Struct):
+        name: str = "Unknown"
+        metric: Optional[List[OptionalMetric]] = None
+
+    class InsuranceHoverData(Struct):
+        hoverDataList: Optional[List[InsuranceHoverEntry]] = None
+
+    class InsuranceHoverFile(Struct):
+        data: Optional[InsuranceHoverData] = None
+
+    class UserHover(Struct):
+        registeredUsers: int
+        appOpens: int
+
+    class UserHoverData(Struct):
+        hoverData: Dict[str, UserHover]
+
+    class UserHoverFile(Struct):
+        data: UserHoverData
+
+    class PincodeEntry(Struct):
+        entityName: str
+        metric: Metric
+
+    class PincodeData(Struct):
+        pincodes: Optional[List[PincodeEntry]] = None
+
+    class PincodeFile(Struct):
+        data: PincodeData
+
+    class UserPincodeEntry(Struct):
+        name: str
+        registeredUsers: int
+
+    class UserPincodeData(Struct):
+        pincodes: Optional[List[UserPincodeEntry]] = None
+
+    class UserPincodeFile(Struct):
+        data: UserPincodeData
+
+    class InsurancePincodeEntry(Struct):
+        entityName: str = "Unknown"
+        metric: Optional[OptionalMetric] = None
+
+    class InsurancePincodeData(Struct):
+        pincodes: Optional[List[InsurancePincodeEntry]] = None
+
+    class InsurancePincodeFile(Struct):
+        data: Optional[InsurancePincodeData] = None
+
+    class UserTotals(Struct):
+        registeredUsers: int
+        appOpens: int
+
+    class UserTotalsData(Struct):
+        aggregated: UserTotals
+
+    class UserTotalsFile(Struct):
+        data: UserTotalsData
+
+    class TransactionLists(Struct):
+        states: Optional[List[PincodeEntry]] = None
+        districts: Optional[List[PincodeEntry]] = None
+        pincodes: Optional[List[PincodeEntry]] = None
+
+    class TransactionListsFile(Struct):
+        data: TransactionLists
+
+    class UserLists(Struct):
+        states: Optional[List[UserPincodeEntry]] = None
+        districts: Optional[List[UserPincodeEntry]] = None
+        pincodes: Optional[List[UserPincodeEntry]] = None
+
+    class UserListsFile(Struct):
+        data: UserLists
+
+    class InsuranceLists(Struct):
+        states: Optional[List[InsurancePincodeEntry]] = None
+        districts: Optional[List[InsurancePincodeEntry]] = None
+        pincodes: Optional[List[InsurancePincodeEntry]] = None
+
+    class InsuranceListsFile(Struct):
+        data: Optional[InsuranceLists] = None
+
+    def first(metrics):
+        return metrics[0] if metrics else OptionalMetric()
+
+    def rows_agg_transaction(f):
+        return [(d.name, d.paymentInstruments[0].count, d.paymentInstruments[0].amount)
+                for d in f.data.transactionData or []]
+
+    def rows_agg_user(f):
+        return [(d.brand, d.count, d.percentage) for d in f.data.usersByDevice or []]
+
+    def rows_agg_insurance(f):
+        entries = f.data.transactionData if f.data else None
+        return [(d.name, first(d.paymentInstruments).count, first(d.paymentInstruments).amount)
+                for d in entries or []]
+
+    def rows_map_transaction(f):
+        return [(d.name, d.metric[0].count, d.metric[0].amount) for d in f.data.hoverDataList or []]
+
+    def rows_map_user(f):
+        return [(district, info.registeredUsers, info.appOpens) for district, info in f.data.hoverData.items()]
+
+    def rows_map_insurance(f):
+        entries = f.data.hoverDataList if f.data else None
+        return [(d.name, first(d.metric).count, first(d.metric).amount) for d in entries or []]
+
+    def rows_top_transaction(f):
+        return [(d.entityName, d.metric.count, d.metric.amount) for d in f.data.pincodes or []]
+
+    def rows_top_user(f):
+        return [(d.name, d.registeredUsers) for d in f.data.pincodes or []]
+
+    def rows_top_insurance(f):
+        entries = f.data.pincodes if f.data else None
+        return [(d.entityName, (d.metric or OptionalMetric()).count, (d.metric or OptionalMetric()).amount)
+                for d in entries or []]
+
+    def lists(data):
+        return [(level, getattr(data, key) or []) for level, key in TOP_LISTS] if data else []
+
+    def rows_agg_user_totals(f):
+        return [(f.data.aggregated.registeredUsers, f.data.aggregated.appOpens)]
+
+    def rows_top_transaction_lists(f):
+        return [(level, d.entityName, d.metric.count, d.metric.amount)
+                for level, entries in lists(f.data) for d in entries]
+
+    def rows_top_user_lists(f):
+        return [(level, d.name, d.registeredUsers) for level, entries in lists(f.data) for d in entries]
+
+    def rows_top_insurance_lists(f):
+        return [(level, d.entityName, (d.metric or OptionalMetric()).count, (d.metric or OptionalMetric()).amount)
+                for level, entries in lists(f.data) for d in entries]
+
+    specs = {
+        "agg_transaction": (TransactionFile, rows_agg_transaction),
+        "agg_user": (UserFile, rows_agg_user),
+        "agg_insurance": (InsuranceFile, rows_agg_insurance),
+        "map_transaction": (HoverFile, rows_map_transaction),
+        "map_user": (UserHoverFile, rows_map_user),
+        "map_insurance": (InsuranceHoverFile, rows_map_insurance),
+        "top_transaction": (PincodeFile, rows_top_transaction),
+        "top_user": (UserPincodeFile, rows_top_user),
+        "top_insurance": (InsurancePincodeFile, rows_top_insurance),
+        "agg_user_totals": (UserTotalsFile, rows_agg_user_totals),
+        "top_transaction_lists": (TransactionListsFile, rows_top_transaction_lists),
+        "top_user_lists": (UserListsFile, rows_top_user_lists),
+        "top_insurance_lists": (InsuranceListsFile, rows_top_insurance_lists),
+    }
+    return {kind: (msgjson.Decoder(file_type), to_rows) for kind, (file_type, to_rows) in specs.items()}
+
+
+_STRUCT_DECODERS = _build_struct_decoders() if JSON_BACKEND == "msgspec" else None
+
+
+# ================= ENTRY POINT =================
+def decode_rows(kind, raw, path):
+    """Decode one quarter file of `kind` into a list of value tuples."""
+    try:
+        if _STRUCT_DECODERS is not None:
+            decoder, to_rows = _STRUCT_DECODERS[kind]
+            return to_rows(decoder.decode(raw))
+        return [tuple(values) for values in EXTRACTORS[kind](_loads(raw))]
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise PulseFormatError(path, f"unexpected {kind} layout ({type(e).__name__}: {e})") from None
+    except ValueError as e:
+        # json.JSONDecodeError, orjson.JSONDecodeError and msgspec's
+        # DecodeError/ValidationError are all ValueErrors
+        raise PulseFormatError(path, f"invalid {kind} file: {e}") from None
@@ -0,0 +1,72 @@
+"""Fail if any dashboard or loader read falls back to a full table scan.
+
+    python explain_check.py
+
+Runs EXPLAIN on every query in queries.py, on the loader's rollup refresh
+for one year and on the data exports, with sample parameters taken from
+the loaded database, and exits non-zero if any plan row scans a whole
+table (access type ALL). Run it against a fully loaded database: on
+near-empty tables the optimizer may prefer a scan regardless of indexes.
+"""
+import sys
+
+import mysql.connector
+
+from config import DB_CONFIG
+from export import EXPORT_TABLES, export_query
+from queries import QUERIES, bind
+from rollups import LEADERBOARD_SIZE, ROLLUPS, years_filter
+
+# (check, table) scans that are expected: aggregated_user has no year index
+# (indexes.py), so the Home export of it reads the small table whole
+EXPECTED_SCANS = {("export home aggregated_user", "aggregated_user")}
+
+
+def _explain(cursor, name, sql, params, failures):
+    cursor.execute(f"EXPLAIN {sql}", params)
+    for plan in cursor.fetchall():
+        table = plan["table"] or "-"
+        access = plan.get("type") or plan.get("select_type")
+        print(f"{name:>40}  {table:<28} {access:<8} key={plan['key']}")
+        # <derivedN>/<unionN> rows read the query's own temporary results
+        if plan["type"] == "ALL" and not table.startswith("<") and (name, table) not in EXPECTED_SCANS:
+            failures.append(f"{name}: full scan of {table}")
+
+
+def main():
+    db = mysql.connector.connect(**DB_CONFIG)
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT States, Years, Quarter FROM rollup_state_quarter "
+                   "ORDER BY Years DESC, Quarter DESC LIMIT 1")
+    row = cursor.fetchone()
+    if row is None:
+        sys.exit("No data loaded; run loader.py first.")
+    values = {"state": row["States"], "year": row["Years"], "quarter": row["Quarter"],
+              "first_quarter": row["Quarter"], "last_quarter": row["Quarter"],
+              "level": "district", "metric": "registered_users", "limit": LEADERBOARD_SIZE}
+
+    failures = []
+    for name in QUERIES:
+        sql, params = bind(name, **values)
+        _explain(cursor, name, sql, params, failures)
+    # the loader refreshes the rollups for the years whose files changed
+    where = years_filter({row["Years"]})
+    for rollup in ROLLUPS:
+        _explain(cursor, f"refresh {rollup.table}", rollup.select.format(where=where), (), failures)
+    # Home exports a year or quarter of every state, Analysis every year of one state
+    for table in EXPORT_TABLES:
+        sql, params = export_query(table, year=row["Years"], quarter=row["Quarter"])
+        _explain(cursor, f"export home {table}", sql, params, failures)
+        sql, params = export_query(table, state=row["States"])
+        _explain(cursor, f"export analysis {table}", sql, params, failures)
+
+    cursor.close()
+    db.close()
+    if failures:
+        print("\n❌ Full table scans:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\n✅ Every dashboard and refresh read uses an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import csv
+import time
+import hashlib
+import tempfile
+
+# ================= DATA EXPORT =================
+# "Download the rows behind this chart": a fact table's rows for the
+# page's filters, streamed from the database in fetchmany() chunks straight
+# into a CSV or Parquet file, so neither the database client nor the writer
+# ever holds the whole result. Files land in static/exports/, which
+# Streamlit serves itself (server.enableStaticServing in
+# .streamlit/config.toml), so a download is a plain link and the file is
+# never read back into the server's memory either. pyarrow is only needed
+# for Parquet.
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "exports")
+EXPORT_URL = "app/static/exports"
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_TTL_SECONDS = 24 * 3600   # exports older than this are removed on the next export
+FORMATS = ("csv", "parquet")
+
+# The per-state fact tables; all of them have States, Years and Quarter
+EXPORT_TABLES = (
+    "aggregated_transaction", "aggregated_user", "aggregated_insurance",
+    "map_transaction", "map_user", "map_insurance",
+    "top_transaction", "top_user", "top_insurance",
+)
+
+
+def export_query(table, year=None, quarter=None, state=None):
+    """(sql, params) selecting `table`'s rows for the given filters; None means any."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"{table} is not an exportable table")
+    filters = [(column, value) for column, value in (("Years", year), ("Quarter", quarter), ("States", state))
+               if value is not None]
+    where = " AND ".join(f"{column} = %s" for column, _ in filters)
+    sql = f"SELECT * FROM {table}" + (f" WHERE {where}" if where else "")
+    return sql, tuple(value for _, value in filters)
+
+
+def export_name(table, fmt, version, year=None, quarter=None, state=None):
+    """File name for an export; it changes with the filters and the data version,
+    so a repeated export of unchanged data reuses the file."""
+    digest = hashlib.sha1(repr((table, year, quarter, state, version)).encode()).hexdigest()[:10]
+    parts = [table, "all-years" if year is None else str(year), "all-quarters" if quarter is None else f"q{quarter}",
+             "india" if state is None else "".join(c if c.isalnum() else "-" for c in str(state))]
+    return f"{'_'.join(parts)}_{digest}.{fmt}"
+
+
+def _write_csv(path, columns, types, chunks):
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
+
+
+def _write_parquet(path, columns, types, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # the schema comes from the query's column types rather than the first
+    # chunk, so a column that starts out NULL keeps its type, and an empty
+    # result is typed too
+    schema = pa.schema([(name, pa.type_for_alias(arrow_type)) for name, arrow_type in zip(columns, types)])
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            arrays = [pa.array(list(column), type=field.type) for column, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def remove_stale_exports(export_dir=EXPORT_DIR, ttl=EXPORT_TTL_SECONDS):
+    cutoff = time.time() - ttl
+    with os.scandir(export_dir) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # renamed or removed by another session meanwhile
+
+
+def write_export(path, fmt, columns, types, chunks):
+    """Write `chunks` (lists of row tuples) to `path` as CSV or Parquet; returns the row count.
+
+    `types` are the columns' Arrow type names ("string", "int64", "float64"),
+    which fix the Parquet schema before any row is read.
+
+    Written under a temporary name and renamed, so a link never points at a
+    half-written file.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    export_dir = os.path.dirname(path)
+    os.makedirs(export_dir, exist_ok=True)
+    remove_stale_exports(export_dir)
+    # sessions are threads of one process, so the temporary name must be unique per call
+    fd, tmp_path = tempfile.mkstemp(dir=export_dir, prefix=".export-", suffix=".tmp")
+    os.close(fd)
+    try:
+        rows = (_write_csv if fmt == "csv" else _write_parquet)(tmp_path, columns, types, chunks)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
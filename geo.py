@@ -0,0 +1,331 @@
+import os
+import re
+import json
+import math
+import tempfile
+
+import requests
+
+from instrument import timed
+
+# ================= SETTINGS =================
+GEOJSON_URL = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+GEO_CACHE_DIR = os.getenv("GEO_CACHE_DIR", "geo_cache")
+# Douglas-Peucker tolerance in degrees (~0.01° ≈ 1 km); 0 keeps full detail
+SIMPLIFY_TOLERANCE = float(os.getenv("GEOJSON_SIMPLIFY_TOLERANCE", "0.01"))
+COORD_DECIMALS = 5
+STATE_KEY = "ST_NM"
+# All-India districts, split per state on first use; DISTRICT_NAME_PROPERTY
+# names the district in the source file
+DISTRICTS_GEOJSON_URL = os.getenv(
+    "DISTRICTS_GEOJSON_URL",
+    "https://raw.githubusercontent.com/geohacker/india/master/district/india_district.geojson")
+DISTRICT_NAME_PROPERTY = os.getenv("DISTRICTS_GEOJSON_NAME_PROPERTY", "NAME_2")
+DISTRICT_KEY = "DISTRICT"
+# District detail levels (Douglas-Peucker tolerance in degrees), coarsest first
+DISTRICT_TOLERANCES = (0.02, 0.005, 0.001)
+
+
+def normalize_state_name(name):
+    return name.strip().upper()
+
+
+def match_key(name):
+    """Loose key for matching Pulse state/district names against GeoJSON ones:
+    'andaman-&-nicobar-islands' and 'Andaman & Nicobar Islands' agree, and a
+    trailing ' district' is dropped."""
+    words = re.sub(r"[^A-Z0-9]+", " ", name.upper().replace("&", " AND ")).split()
+    if words and words[-1] == "DISTRICT":
+        words.pop()
+    return " ".join(words)
+
+
+# ================= DISK CACHE =================
+def _write_json(path, data):
+    # write-then-rename so a concurrent reader never sees a half-written file;
+    # sessions are threads of one process, so the temporary name is unique per call
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _fetch_geojson(url, path):
+    if not os.path.exists(path):
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_json(path, response.json())
+    with open(path) as f:
+        return json.load(f)
+
+
+def fetch_states_geojson(cache_dir=GEO_CACHE_DIR):
+    """India states GeoJSON, downloaded once and then read from disk."""
+    return _fetch_geojson(GEOJSON_URL, os.path.join(cache_dir, "india_states.geojson"))
+
+
+# ================= SIMPLIFICATION =================
+def _point_segment_distance(p, a, b):
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def _douglas_peucker(points, tolerance):
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        best, best_index = 0.0, None
+        for i in range(start + 1, end):
+            d = _point_segment_distance(points[i], points[start], points[end])
+            if d > best:
+                best, best_index = d, i
+        if best_index is not None and best > tolerance:
+            keep[best_index] = True
+            stack.append((start, best_index))
+            stack.append((best_index, end))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _simplify_run(points, tolerance):
+    # simplify in a canonical direction so both polygons sharing a border
+    # drop exactly the same vertices from it
+    if points[-1] < points[0]:
+        return _douglas_peucker(points[::-1], tolerance)[::-1]
+    return _douglas_peucker(points, tolerance)
+
+
+def _simplify_ring(ring, owners, tolerance):
+    points = ring[:-1]
+    n = len(points)
+    if n < 4:
+        return ring
+    # pin every vertex where the set of polygons sharing it changes; the runs
+    # between pins are whole shared borders (or unshared coastline)
+    pins = [i for i in range(n)
+            if owners[points[i]] != owners[points[i - 1]] or owners[points[i]] != owners[points[(i + 1) % n]]]
+    if len(pins) < 2:
+        far = max(range(n), key=lambda i: math.hypot(points[i][0] - points[0][0], points[i][1] - points[0][1]))
+        pins = sorted({0, far} | set(pins))
+    simplified = []
+    for k, start in enumerate(pins):
+        end = pins[(k + 1) % len(pins)]
+        run = points[start:end + 1] if end > start else points[start:] + points[:end + 1]
+        simplified.extend(_simplify_run(run, tolerance)[:-1])
+    if len(simplified) < 3:
+        return ring
+    return simplified + [simplified[0]]
+
+
+def _polygons(geometry):
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+def simplify_geojson(geojson, tolerance=SIMPLIFY_TOLERANCE, decimals=COORD_DECIMALS):
+    """Topology-preserving Douglas-Peucker over a FeatureCollection.
+
+    Borders shared by neighbouring features are simplified identically, so
+    no gaps or overlaps open up between states. Coordinates are rounded to
+    `decimals` places to shrink the serialized payload.
+    """
+    features = []
+    for feature in geojson["features"]:
+        geometry = feature.get("geometry")
+        rings = [[tuple(round(c, decimals) for c in point[:2]) for point in ring]
+                 for polygon in (_polygons(geometry) if geometry else []) for ring in polygon]
+        features.append(rings)
+
+    owners = {}
+    for feature_id, rings in enumerate(features):
+        for ring in rings:
+            for point in ring:
+                owners.setdefault(point, set()).add(feature_id)
+    owners = {point: frozenset(ids) for point, ids in owners.items()}
+
+    out = []
+    for feature, rings in zip(geojson["features"], features):
+        geometry = feature.get("geometry")
+        if geometry and tolerance > 0:
+            rings = iter([_simplify_ring(ring, owners, tolerance) for ring in rings])
+        else:
+            rings = iter(rings)
+        polygons = [[[list(p) for p in next(rings)] for _ in polygon]
+                    for polygon in (_polygons(geometry) if geometry else [])]
+        if geometry and geometry["type"] == "Polygon":
+            geometry = {"type": "Polygon", "coordinates": polygons[0]}
+        elif geometry and geometry["type"] == "MultiPolygon":
+            geometry = {"type": "MultiPolygon", "coordinates": polygons}
+        out.append({"type": "Feature", "properties": dict(feature.get("properties") or {}), "geometry": geometry})
+    return {"type": "FeatureCollection", "features": out}
+
+
+# ================= STATE GEOMETRY =================
+@timed("geo.load_state_geometry")
+def load_state_geometry(tolerance=SIMPLIFY_TOLERANCE, cache_dir=GEO_CACHE_DIR):
+    """Simplified India states GeoJSON with normalized ST_NM.
+
+    The simplified collection is cached on disk per tolerance, so only the
+    first start on a machine pays for downloading and simplifying.
+    """
+    path = os.path.join(cache_dir, f"india_states.simplified-{tolerance:g}.geojson")
+    if os.path.exists(path):
+        with open(path) as f:
+            geojson = json.load(f)
+    else:
+        geojson = simplify_geojson(fetch_states_geojson(cache_dir), tolerance)
+        for feature in geojson["features"]:
+            props = feature["properties"]
+            if STATE_KEY in props:
+                props[STATE_KEY] = normalize_state_name(props[STATE_KEY])
+        _write_json(path, geojson)
+    return geojson
+
+
+# ================= DISTRICT GEOMETRY =================
+# The all-India district file is several megabytes, far too much to send to
+# the browser for one state. It is downloaded and split once into a file per
+# state (geo_cache/districts/<STATE>.geojson) plus an index of each state's
+# bounds; a state's file is then simplified lazily, once per detail level,
+# the first time someone drills into that state at that level.
+
+def _bounds(rings):
+    xs = [x for ring in rings for x, _ in ring]
+    ys = [y for ring in rings for _, y in ring]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _contains(rings, x, y):
+    # even-odd ray casting over every ring, so holes are excluded
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+def _rings(geometry):
+    return [[point[:2] for point in ring] for polygon in (_polygons(geometry) if geometry else []) for ring in polygon]
+
+
+def _state_of(rings, states):
+    """Name of the state containing a district's mean vertex, or of the state
+    whose bounding box is centered nearest to it if none contains it."""
+    largest = max(rings, key=len)
+    x = sum(p[0] for p in largest) / len(largest)
+    y = sum(p[1] for p in largest) / len(largest)
+    for name, state_rings, (x0, y0, x1, y1) in states:
+        if x0 <= x <= x1 and y0 <= y <= y1 and _contains(state_rings, x, y):
+            return name
+    return min(states, key=lambda s: math.hypot((s[2][0] + s[2][2]) / 2 - x, (s[2][1] + s[2][3]) / 2 - y))[0]
+
+
+def _district_path(cache_dir, state_name, suffix="geojson"):
+    return os.path.join(cache_dir, "districts", f"{match_key(state_name).replace(' ', '_')}.{suffix}")
+
+
+@timed("geo.split_districts")
+def split_districts(cache_dir=GEO_CACHE_DIR):
+    """Download the all-India districts and write one full-detail file per state.
+
+    Each district goes to the state polygon containing it, so only the
+    states GeoJSON's names need to match Pulse's. Districts get a normalized
+    DISTRICT name and the ST_NM of their state. Returns {ST_NM: bounds}.
+    """
+    states = []
+    for feature in fetch_states_geojson(cache_dir)["features"]:
+        name = feature["properties"].get(STATE_KEY)
+        rings = _rings(feature.get("geometry"))
+        if name and rings:
+            states.append((normalize_state_name(name), rings, _bounds(rings)))
+    districts = _fetch_geojson(DISTRICTS_GEOJSON_URL, os.path.join(cache_dir, "india_districts.geojson"))
+
+    per_state = {}
+    for feature in districts["features"]:
+        rings = _rings(feature.get("geometry"))
+        if not rings:
+            continue
+        state_name = _state_of(rings, states)
+        name = normalize_state_name(str(feature["properties"].get(DISTRICT_NAME_PROPERTY) or ""))
+        per_state.setdefault(state_name, []).append({
+            "type": "Feature", "properties": {DISTRICT_KEY: name, STATE_KEY: state_name},
+            "geometry": feature["geometry"]})
+
+    index = {}
+    os.makedirs(os.path.join(cache_dir, "districts"), exist_ok=True)
+    for state_name, features in per_state.items():
+        _write_json(_district_path(cache_dir, state_name), {"type": "FeatureCollection", "features": features})
+        index[state_name] = _bounds([ring for f in features for ring in _rings(f["geometry"])])
+    # written last: its presence marks the split complete
+    _write_json(os.path.join(cache_dir, "districts", "index.json"), index)
+    return index
+
+
+def district_index(cache_dir=GEO_CACHE_DIR):
+    """{ST_NM: (min lon, min lat, max lon, max lat)} of every state with districts."""
+    path = os.path.join(cache_dir, "districts", "index.json")
+    if not os.path.exists(path):
+        return split_districts(cache_dir)
+    with open(path) as f:
+        return {name: tuple(bounds) for name, bounds in json.load(f).items()}
+
+
+def match_state(name, state_names):
+    """The one of `state_names` that a Pulse state name refers to, or None.
+
+    Pulse and the GeoJSON don't always agree on long names ('Andaman &
+    Nicobar Islands' vs 'Andaman & Nicobar'), so one may extend the other.
+    """
+    key = match_key(name)
+    keys = {match_key(candidate): candidate for candidate in state_names}
+    if key in keys:
+        return keys[key]
+    return next((candidate for k, candidate in keys.items()
+                 if k and (key.startswith(k + " ") or k.startswith(key + " "))), None)
+
+
+def fit_view(bounds, width=600, height=450):
+    """(longitude, latitude, zoom) framing `bounds` in a width x height pixel map."""
+    x0, y0, x1, y1 = bounds
+    zoom = min(math.log2(width * 360 / 256 / max(x1 - x0, 1e-3)),
+               math.log2(height * 360 / 256 / max(y1 - y0, 1e-3)))
+    return (x0 + x1) / 2, (y0 + y1) / 2, max(4.0, min(10.0, zoom))
+
+
+def district_tolerance(zoom):
+    """Coarsest detail level whose tolerance is within a pixel at `zoom`."""
+    degrees_per_pixel = 360 / (256 * 2 ** zoom)
+    return next((t for t in DISTRICT_TOLERANCES if t <= degrees_per_pixel), DISTRICT_TOLERANCES[-1])
+
+
+@timed("geo.load_district_geometry")
+def load_district_geometry(state_name, tolerance, cache_dir=GEO_CACHE_DIR):
+    """One state's districts (by ST_NM) simplified to `tolerance`.
+
+    Borders between the state's districts stay shared after simplifying;
+    the result is cached on disk per state and tolerance.
+    """
+    path = _district_path(cache_dir, state_name, f"simplified-{tolerance:g}.geojson")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    if not os.path.exists(_district_path(cache_dir, state_name)):
+        split_districts(cache_dir)
+    with open(_district_path(cache_dir, state_name)) as f:
+        geojson = simplify_geojson(json.load(f), tolerance)
+    _write_json(path, geojson)
+    return geojson
@@ -0,0 +1,59 @@
+from collections import namedtuple
+
+from instrument import span
+
+# ================= SECONDARY INDEXES =================
+# Every table's primary key starts with States, which only helps per-state
+# reads. The dashboard's own SQL reads (queries.py) are all primary-key
+# ranges of the rollup tables and fact tables; the other access paths are
+# the loader's rollup refresh, which reads the fact tables and
+# rollup_state_quarter by year, and the Home page's export of a year's (or
+# quarter's) rows. These indexes serve those, and are created after the bulk
+# load so inserts don't pay for them row by row. explain_check.py checks
+# every one of these reads.
+
+Index = namedtuple("Index", ["table", "name", "columns"])
+
+INDEXES = [
+    Index("aggregated_transaction", "idx_agg_tran_period", ["Years", "Quarter"]),
+    Index("aggregated_insurance", "idx_agg_insur_period", ["Years", "Quarter"]),
+    Index("map_transaction", "idx_map_tran_years", ["Years", "Quarter"]),
+    Index("map_user", "idx_map_user_years", ["Years", "Quarter"]),
+    Index("map_insurance", "idx_map_insur_years", ["Years", "Quarter"]),
+    Index("top_transaction", "idx_top_tran_years", ["Years", "Quarter"]),
+    Index("top_user", "idx_top_user_years", ["Years", "Quarter"]),
+    Index("top_insurance", "idx_top_insur_years", ["Years", "Quarter"]),
+    # rollup_state_year and rollup_national_quarter are refreshed from it by year
+    Index("rollup_state_quarter", "idx_rollup_state_quarter_period", ["Years", "Quarter", "States"]),
+    # Growth ranking: every state for one period
+    Index("derived_metrics", "idx_derived_metrics_period", ["Years", "Quarter", "Level"]),
+]
+
+# Indexes earlier versions created for reads the in-memory cubes serve now.
+# aggregated_user is only ever read whole (the cubes, derived_device_share)
+# apart from the Home export, which scans the small table instead.
+RETIRED_INDEXES = [
+    Index("map_user", "idx_map_user_period", None),
+    Index("rollup_state_year", "idx_rollup_state_year_period", None),
+    Index("aggregated_user", "idx_agg_user_period", None),
+]
+
+
+def ensure_indexes(db, cursor):
+    """Create any index from INDEXES that the schema doesn't have yet, and
+    drop any RETIRED_INDEXES it still has."""
+    cursor.execute(
+        "SELECT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()")
+    existing = set(cursor.fetchall())
+    for index in RETIRED_INDEXES:
+        if (index.table, index.name) in existing:
+            with span("loader.drop_index", table=index.table, index=index.name):
+                cursor.execute(f"DROP INDEX {index.name} ON {index.table}")
+            print(f"🗑️ Dropped unused index {index.name} on {index.table}")
+    for index in INDEXES:
+        if (index.table, index.name) in existing:
+            continue
+        with span("loader.create_index", table=index.table, index=index.name):
+            cursor.execute(f"CREATE INDEX {index.name} ON {index.table} ({', '.join(index.columns)})")
+        print(f"✅ Created index {index.name} on {index.table}")
+    db.commit()
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import logging
+import threading
+from functools import wraps
+
+# ================= SPANS =================
+# Timing spans for the loader and the dashboard:
+#
+#     with span("home.query", name="periods") as s:
+#         ...
+#         s.set(rows=len(df))
+#
+# Tracing is off unless PULSE_TRACE=1 (or a session opts in with
+# start_collection(force=True)); when off, span() returns a shared no-op
+# object, so instrumented code pays one function call per span.
+# Finished spans are logged as one JSON line each on the "pulse.trace"
+# logger and collected per thread, so the dashboard can show the spans
+# of the current rerun.
+
+ENABLED = os.getenv("PULSE_TRACE", "") not in ("", "0")
+logger = logging.getLogger("pulse.trace")
+_local = threading.local()
+
+
+def enabled():
+    return ENABLED or getattr(_local, "force", False)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("name", "fields", "start", "seconds", "depth")
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.seconds = 0.0
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.depth = getattr(_local, "depth", 0)
+        _local.depth = self.depth + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        _local.depth = self.depth
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        _record(self)
+        return False
+
+
+def _record(s):
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append(s)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"span": s.name, "ms": round(s.seconds * 1000, 3), "depth": s.depth,
+                                **s.fields}, default=str))
+
+
+def span(name, /, **fields):
+    if not enabled():
+        return _NULL_SPAN
+    return Span(name, fields)
+
+
+def timed(name=None):
+    """Decorator form of span(); the span is named after the function by default."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(name, iterable, **fields):
+    """Yield from `iterable`, recording the time spent producing items (not
+    consuming them) as one span when it is exhausted."""
+    if not enabled():
+        yield from iterable
+        return
+    s = Span(name, fields)
+    s.depth = getattr(_local, "depth", 0)
+    s.start = time.perf_counter()
+    items = 0
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            s.seconds += time.perf_counter() - start
+            break
+        s.seconds += time.perf_counter() - start
+        items += 1
+        yield item
+    s.fields["items"] = items
+    _record(s)
+
+
+# ================= COLLECTION =================
+def start_collection(force=False):
+    """Start collecting this thread's spans (e.g. one Streamlit rerun)."""
+    _local.spans = []
+    _local.depth = 0
+    _local.force = force
+
+
+def collected():
+    """This thread's finished spans, in start order."""
+    return sorted(getattr(_local, "spans", None) or [], key=lambda s: s.start)
+
+
+def configure_logging():
+    """Send trace lines to stderr when tracing is on and nothing else is configured."""
+    if enabled() and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
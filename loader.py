@@ -1,15 +1,24 @@
 import os
-import json
+import hashlib
+import argparse
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
 import mysql.connector
 
-# ================= DATABASE CONNECTION =================
-db = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="######",
-    database="phonepe_pulse"
-)
-cursor = db.cursor()
+from config import DATA_ROOT, DB_CONFIG
+from decoders import JSON_BACKEND, PulseFormatError, decode_rows
+from indexes import ensure_indexes
+from instrument import span, timed_iter, configure_logging
+from partitions import add_partitions, drop_staging, ensure_partitioned, exchange_partition, stage_partition
+from rollups import DERIVED, RETIRED_TABLES, ROLLUPS, refresh_rollups
+from snapshot import SNAPSHOT_DIR, ParquetTableWriter, staging_dir, publish_snapshot
+from sources import open_source
+from writers import WRITER_MODES, CHUNK_SIZE, make_writer, disable_keys, enable_keys
+
+# ================= CONFIGURATION =================
+BATCH_SIZE = 5000       # rows per executemany + commit
+FILES_PER_TASK = 64     # JSON files parsed by one worker task
 
 # ================= CREATE TABLES =================
 create_queries = [
@@ -91,217 +100,422 @@ create_queries = [
         Quarter INT,
         Pincodes INT,
         RegisteredUser BIGINT,
-        PRIMARY KEY (States, Years, Quarter, Pincodes))'''
+        PRIMARY KEY (States, Years, Quarter, Pincodes))''',
+
+    # country-level files (country/india/<year>/<quarter>.json), stored with States = ''
+    '''CREATE TABLE IF NOT EXISTS national_transaction (
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,
+        Transaction_type VARCHAR(50),
+        Transaction_count BIGINT,
+        Transaction_amount DOUBLE,
+        PRIMARY KEY (States, Years, Quarter, Transaction_type))''',
+
+    '''CREATE TABLE IF NOT EXISTS national_user (
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,
+        RegisteredUser BIGINT,
+        AppOpens BIGINT,
+        PRIMARY KEY (States, Years, Quarter))''',
+
+    '''CREATE TABLE IF NOT EXISTS national_insurance (
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,
+        Insurance_type VARCHAR(50),
+        Insurance_count BIGINT,
+        Insurance_amount DOUBLE,
+        PRIMARY KEY (States, Years, Quarter, Insurance_type))''',
+
+    # Level is 'state', 'district' or 'pincode': the top 10 of each across India
+    '''CREATE TABLE IF NOT EXISTS national_top_transaction (
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,
+        Level VARCHAR(10),
+        Entity VARCHAR(50),
+        Transaction_count BIGINT,
+        Transaction_amount DOUBLE,
+        PRIMARY KEY (States, Years, Quarter, Level, Entity))''',
+
+    '''CREATE TABLE IF NOT EXISTS national_top_user (
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,
+        Level VARCHAR(10),
+        Entity VARCHAR(50),
+        RegisteredUser BIGINT,
+        PRIMARY KEY (States, Years, Quarter, Level, Entity))''',
+
+    '''CREATE TABLE IF NOT EXISTS national_top_insurance (
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,
+        Level VARCHAR(10),
+        Entity VARCHAR(50),
+        Transaction_count BIGINT,
+        Transaction_amount DOUBLE,
+        PRIMARY KEY (States, Years, Quarter, Level, Entity))''',
+
+    '''CREATE TABLE IF NOT EXISTS load_manifest (
+        Path VARCHAR(255),
+        Table_name VARCHAR(50),
+        Size BIGINT,
+        Mtime DOUBLE,
+        Content_hash CHAR(40),
+        Rows_loaded INT,
+        Loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (Path))''',
+
+    # one row per finished run; the dashboard drops its query cache when this changes
+    '''CREATE TABLE IF NOT EXISTS load_runs (
+        Run_id INT AUTO_INCREMENT,
+        Files_loaded INT,
+        Rows_loaded BIGINT,
+        Finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (Run_id))'''
+]
+
+# ================= DATASETS =================
+# `kind` names the decoder in decoders.py that turns a file into rows;
+# `key_size` is how many of `columns` belong to the primary key
+Dataset = namedtuple("Dataset", ["table", "path", "columns", "kind", "key_size"], defaults=[1])
+
+DATASETS = [
+    Dataset("aggregated_transaction", "aggregated/transaction/country/india/state",
+            ["Transaction_type", "Transaction_count", "Transaction_amount"], "agg_transaction"),
+    Dataset("aggregated_user", "aggregated/user/country/india/state",
+            ["Brands", "Transaction_count", "Percentage"], "agg_user"),
+    Dataset("map_transaction", "map/transaction/hover/country/india/state",
+            ["District", "Transaction_count", "Transaction_amount"], "map_transaction"),
+    Dataset("map_user", "map/user/hover/country/india/state",
+            ["Districts", "RegisteredUser", "AppOpens"], "map_user"),
+    Dataset("top_transaction", "top/transaction/country/india/state",
+            ["Pincodes", "Transaction_count", "Transaction_amount"], "top_transaction"),
+    Dataset("top_user", "top/user/country/india/state",
+            ["Pincodes", "RegisteredUser"], "top_user"),
+    Dataset("aggregated_insurance", "aggregated/insurance/country/india/state",
+            ["Insurance_type", "Insurance_count", "Insurance_amount"], "agg_insurance"),
+    Dataset("map_insurance", "map/insurance/hover/country/india/state",
+            ["District", "Transaction_count", "Transaction_amount"], "map_insurance"),
+    Dataset("top_insurance", "top/insurance/country/india/state",
+            ["Pincodes", "Transaction_count", "Transaction_amount"], "top_insurance"),
+    # upstream's own all-India figures, one file per quarter next to the state/ directory
+    Dataset("national_transaction", "aggregated/transaction/country/india",
+            ["Transaction_type", "Transaction_count", "Transaction_amount"], "agg_transaction"),
+    Dataset("national_user", "aggregated/user/country/india",
+            ["RegisteredUser", "AppOpens"], "agg_user_totals", key_size=0),
+    Dataset("national_insurance", "aggregated/insurance/country/india",
+            ["Insurance_type", "Insurance_count", "Insurance_amount"], "agg_insurance"),
+    Dataset("national_top_transaction", "top/transaction/country/india",
+            ["Level", "Entity", "Transaction_count", "Transaction_amount"], "top_transaction_lists", key_size=2),
+    Dataset("national_top_user", "top/user/country/india",
+            ["Level", "Entity", "RegisteredUser"], "top_user_lists", key_size=2),
+    Dataset("national_top_insurance", "top/insurance/country/india",
+            ["Level", "Entity", "Transaction_count", "Transaction_amount"], "top_insurance_lists", key_size=2),
 ]
 
-for query in create_queries:
-    cursor.execute(query)
-db.commit()
-print("✅ Tables created successfully!")
 
-# ================= HELPER FUNCTION =================
-def insert_data(table, query, data):
-    if not data:
+KEY_COLUMNS = ["States", "Years", "Quarter"]
+
+
+MANIFEST_QUERY = '''INSERT INTO load_manifest
+(Path, Table_name, Size, Mtime, Content_hash, Rows_loaded)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE Table_name = VALUES(Table_name), Size = VALUES(Size), Mtime = VALUES(Mtime),
+    Content_hash = VALUES(Content_hash), Rows_loaded = VALUES(Rows_loaded)'''
+
+
+# ================= MANIFEST =================
+def read_manifest(cursor):
+    cursor.execute("SELECT Path, Size, Mtime, Content_hash FROM load_manifest")
+    return {path: (size, mtime, content_hash) for path, size, mtime, content_hash in cursor.fetchall()}
+
+
+def pending_files(source, dataset, manifest):
+    """Drop files whose size and mtime match the manifest; attach the known
+    content hash to the rest so workers can skip files that were only touched."""
+    def wanted(rel_path, size, mtime):
+        known = manifest.get(rel_path)
+        return not (known and known[0] == size and known[1] == mtime)
+
+    for state, year, quarter, rel_path, member, size, mtime in source.walk(dataset, wanted):
+        if not wanted(rel_path, size, mtime):
+            continue
+        known = manifest.get(rel_path)
+        yield state, year, quarter, member, rel_path, size, mtime, known[2] if known else None
+
+
+# ================= PARSE =================
+def parse_files(dataset_index, source, jobs):
+    """Worker task: parse a chunk of quarter files read from `source` (sources.py).
+
+    Returns (results, errors): one (year, manifest_entry, rows) triple per
+    parsed file, where rows is None when the content hash matches the
+    manifest and nothing needs to be written, and one message per file
+    that could not be decoded.
+    """
+    dataset = DATASETS[dataset_index]
+    results, errors = [], []
+    with span("loader.parse", table=dataset.table, files=len(jobs)):
+        for state, year, quarter, member, rel_path, size, mtime, known_hash in jobs:
+            raw = source.read(member)
+            content_hash = hashlib.sha1(raw).hexdigest()
+            rows = None
+            if content_hash != known_hash:
+                try:
+                    rows = [(state, year, quarter) + values for values in decode_rows(dataset.kind, raw, rel_path)]
+                except PulseFormatError as e:
+                    errors.append(str(e))
+                    continue
+            entry = (rel_path, dataset.table, size, mtime, content_hash, len(rows) if rows is not None else None)
+            results.append((year, entry, rows))
+    return results, errors
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bounded_map(executor, fn, args_iter, window):
+    """Like executor.map, but keeps at most `window` tasks in flight so
+    results never pile up faster than the database can absorb them."""
+    pending = deque()
+    for args in args_iter:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# ================= INSERT =================
+def insert_batch(db, cursor, writer, rows, manifest_entries, deferred=None):
+    # rows and the manifest entries describing them commit together, so an
+    # interrupted run never marks a file as loaded without its rows
+    with span("loader.insert", rows=len(rows), files=len(manifest_entries)):
+        if rows:
+            writer.write(rows)
+        if db is None:
+            return  # Parquet snapshot: no database, no manifest
+        if deferred is not None:
+            # staged for a partition exchange: the rows only go live with the
+            # swap, so the caller records the files after it
+            deferred.extend(manifest_entries)
+        else:
+            cursor.executemany(MANIFEST_QUERY, manifest_entries)
+        db.commit()
+
+
+def load_dataset(db, cursor, dataset_index, source, manifest, executor, workers, batch_size, writer):
+    """Ingest one dataset from `source` (sources.py); returns (changed files, rows written, years touched)."""
+    dataset = DATASETS[dataset_index]
+    with span("loader.dataset", table=dataset.table) as dataset_span:
+        files = timed_iter("loader.walk", pending_files(source, dataset, manifest), table=dataset.table)
+        changed, total_rows, years = _load_dataset(db, cursor, dataset_index, source, files, executor,
+                                                   workers, batch_size, writer)
+        dataset_span.set(files=changed, rows=total_rows)
+    return changed, total_rows, years
+
+
+def load_dataset_partitioned(db, cursor, dataset_index, source, manifest, executor, workers, batch_size,
+                             writer_mode, chunk_size):
+    """Ingest one dataset a quarter at a time through partition exchange.
+
+    Each quarter with new or changed files is copied to a staging table,
+    the files are upserted into the copy, and the copy is swapped in as the
+    quarter's partition (partitions.py). Returns the same as load_dataset.
+    """
+    dataset = DATASETS[dataset_index]
+    with span("loader.dataset", table=dataset.table, mode="exchange") as dataset_span:
+        periods = defaultdict(list)
+        for job in timed_iter("loader.walk", pending_files(source, dataset, manifest), table=dataset.table):
+            periods[job[1], job[2]].append(job)
+        partitions = ensure_partitioned(cursor, dataset.table)
+        add_partitions(cursor, dataset.table, partitions, periods)
+
+        changed = total_rows = 0
+        years = set()
+        for (year, quarter), jobs in sorted(periods.items()):
+            staging = stage_partition(cursor, dataset.table, year, quarter)
+            writer = make_writer(writer_mode, cursor, staging, KEY_COLUMNS, dataset.columns, chunk_size=chunk_size,
+                                 key_size=dataset.key_size)
+            entries = []
+            try:
+                files, rows, _ = _load_dataset(db, cursor, dataset_index, source, jobs, executor, workers,
+                                               batch_size, writer, deferred=entries)
+                if files:
+                    exchange_partition(cursor, dataset.table, year, quarter, staging)
+                    print(f"🔁 {dataset.table}: swapped in {year} Q{quarter}")
+            finally:
+                drop_staging(cursor, staging)
+            if entries:
+                cursor.executemany(MANIFEST_QUERY, entries)
+            db.commit()
+            changed += files
+            total_rows += rows
+            if files:
+                years.add(year)
+        dataset_span.set(files=changed, rows=total_rows)
+    return changed, total_rows, years
+
+
+def _load_dataset(db, cursor, dataset_index, source, files, executor, workers, batch_size, writer, deferred=None):
+    dataset = DATASETS[dataset_index]
+    tasks = ((dataset_index, source, jobs) for jobs in chunked(files, FILES_PER_TASK))
+    if executor is None:
+        results = (parse_files(*args) for args in tasks)
+    else:
+        results = bounded_map(executor, parse_files, tasks, window=workers * 2)
+
+    batch, entries, years = [], [], set()
+    total_rows = changed = unchanged = failed = 0
+    for file_results, errors in results:
+        for error in errors:
+            # left out of the manifest, so the file is retried on the next run
+            print(f"❌ {error}")
+        failed += len(errors)
+        for year, entry, rows in file_results:
+            if rows is None:
+                # touched but identical: just refresh size/mtime, keep the old row count
+                unchanged += 1
+                cursor.execute("UPDATE load_manifest SET Size = %s, Mtime = %s WHERE Path = %s",
+                               (entry[2], entry[3], entry[0]))
+                continue
+            changed += 1
+            years.add(year)
+            batch.extend(rows)
+            entries.append(entry)
+        if len(batch) >= batch_size:
+            insert_batch(db, cursor, writer, batch, entries, deferred)
+            total_rows += len(batch)
+            batch, entries = [], []
+    if batch or entries:
+        insert_batch(db, cursor, writer, batch, entries, deferred)
+        total_rows += len(batch)
+    if db is not None:
+        db.commit()
+    print(f"✅ {dataset.table}: {changed} new/changed files, {total_rows} rows upserted"
+          f" ({unchanged} touched but unchanged, {failed} failed), {writer.rows_per_second():,.0f} rows/s")
+    return changed, total_rows, years
+
+
+# ================= PARQUET SNAPSHOT =================
+def write_snapshot(args):
+    """Write every dataset to a fresh Parquet snapshot and swap it in.
+
+    Snapshots are always rebuilt in full; the manifest only tracks MySQL loads.
+    """
+    staging = staging_dir(args.snapshot_dir)
+    source = open_source(args.data_root)
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        for i, dataset in enumerate(DATASETS):
+            writer = ParquetTableWriter(staging, dataset.table, KEY_COLUMNS, dataset.columns)
+            try:
+                load_dataset(None, None, i, source, {}, executor, args.workers, args.batch_size, writer)
+            finally:
+                writer.close()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    publish_snapshot(staging, args.snapshot_dir)
+    print(f"🎉 Parquet snapshot written to {args.snapshot_dir}")
+
+
+# ================= MAIN =================
+def main():
+    parser = argparse.ArgumentParser(description="Load PhonePe Pulse JSON data into MySQL")
+    parser.add_argument("--data-root", default=DATA_ROOT,
+                        help="pulse-main/data directory, or the repository .zip / tarball (default: PHONEPE_PATH)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="parser processes (1 = parse in this process)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per insert batch")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the manifest and re-ingest every file")
+    parser.add_argument("--writer", choices=WRITER_MODES, default="executemany",
+                        help="executemany, multi-row INSERT, or LOAD DATA LOCAL INFILE spooling")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="rows per multi-row statement / infile spool")
+    parser.add_argument("--disable-keys", action="store_true",
+                        help="disable index maintenance while a table loads and rebuild afterwards")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="rebuild every year of the rollup tables, not just the years loaded")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="partition the tables by year and quarter and swap each changed quarter "
+                             "in with EXCHANGE PARTITION")
+    parser.add_argument("--sink", choices=["mysql", "parquet"], default="mysql",
+                        help="load into MySQL, or write a partitioned Parquet snapshot instead")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="output directory for --sink parquet")
+    args = parser.parse_args()
+    configure_logging()
+    print(f"Parsing JSON with {JSON_BACKEND}")
+
+    if args.sink == "parquet":
+        write_snapshot(args)
         return
-    cursor.executemany(query, data)
+
+    db = mysql.connector.connect(**DB_CONFIG, allow_local_infile=args.writer == "infile")
+    cursor = db.cursor()
+
+    for query in create_queries + [rollup.create for rollup in ROLLUPS + DERIVED]:
+        cursor.execute(query)
+    for table in RETIRED_TABLES:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    db.commit()
+    print("✅ Tables created successfully!")
+
+    manifest = {} if args.full else read_manifest(cursor)
+    source = open_source(args.data_root)
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    files_loaded = rows_loaded = 0
+    years_loaded = set()
+    try:
+        for i, dataset in enumerate(DATASETS):
+            if args.disable_keys:
+                disable_keys(cursor, dataset.table)
+            try:
+                if args.partitioned:
+                    changed, rows, years = load_dataset_partitioned(
+                        db, cursor, i, source, manifest, executor, args.workers, args.batch_size,
+                        args.writer, args.chunk_size)
+                else:
+                    writer = make_writer(args.writer, cursor, dataset.table, KEY_COLUMNS, dataset.columns,
+                                         chunk_size=args.chunk_size, key_size=dataset.key_size)
+                    changed, rows, years = load_dataset(db, cursor, i, source, manifest, executor,
+                                                        args.workers, args.batch_size, writer)
+                files_loaded += changed
+                rows_loaded += rows
+                years_loaded |= years
+            finally:
+                if args.disable_keys:
+                    enable_keys(cursor, dataset.table)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # ================= POST-PROCESSING =================
+    ensure_indexes(db, cursor)
+    refresh_rollups(db, cursor, None if args.rebuild_rollups else years_loaded)
+
+    cursor.execute("INSERT INTO load_runs (Files_loaded, Rows_loaded) VALUES (%s, %s)",
+                   (files_loaded, rows_loaded))
     db.commit()
-    print(f"✅ Inserted {len(data)} rows into {table}")
-
-# ================= 1. AGGREGATED TRANSACTION =================
-base_path = "pulse-main/data/aggregated/transaction/country/india/state/"
-agg_tran_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    for d in data["data"]["transactionData"] or []:
-                        name = d["name"]
-                        count = d["paymentInstruments"][0]["count"]
-                        amount = d["paymentInstruments"][0]["amount"]
-                        agg_tran_data.append((state, year, quarter, name, count, amount))
-
-insert_query_tran = '''INSERT IGNORE INTO aggregated_transaction
-(States, Years, Quarter, Transaction_type, Transaction_count, Transaction_amount)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("aggregated_transaction", insert_query_tran, agg_tran_data)
-
-# ================= 2. AGGREGATED USER =================
-base_path = "pulse-main/data/aggregated/user/country/india/state/"
-agg_user_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    if data["data"]["usersByDevice"]:
-                        for d in data["data"]["usersByDevice"]:
-                            brand = d["brand"]
-                            count = d["count"]
-                            percentage = d["percentage"]
-                            agg_user_data.append((state, year, quarter, brand, count, percentage))
-
-insert_query_user = '''INSERT IGNORE INTO aggregated_user
-(States, Years, Quarter, Brands, Transaction_count, Percentage)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("aggregated_user", insert_query_user, agg_user_data)
-
-# ================= 3. MAP TRANSACTION =================
-base_path = "pulse-main/data/map/transaction/hover/country/india/state/"
-map_tran_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    for d in data["data"]["hoverDataList"] or []:
-                        district = d["name"]
-                        count = d["metric"][0]["count"]
-                        amount = d["metric"][0]["amount"]
-                        map_tran_data.append((state, year, quarter, district, count, amount))
-
-insert_query_map_tran = '''INSERT IGNORE INTO map_transaction
-(States, Years, Quarter, District, Transaction_count, Transaction_amount)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("map_transaction", insert_query_map_tran, map_tran_data)
-
-# ================= 4. MAP USER =================
-base_path = "pulse-main/data/map/user/hover/country/india/state/"
-map_user_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    for district, info in data["data"]["hoverData"].items():
-                        registered = info["registeredUsers"]
-                        app_opens = info["appOpens"]
-                        map_user_data.append((state, year, quarter, district, registered, app_opens))
-
-insert_query_map_user = '''INSERT IGNORE INTO map_user
-(States, Years, Quarter, Districts, RegisteredUser, AppOpens)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("map_user", insert_query_map_user, map_user_data)
-
-# ================= 5. TOP TRANSACTION =================
-base_path = "pulse-main/data/top/transaction/country/india/state/"
-top_tran_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    for d in data["data"]["pincodes"] or []:
-                        pincode = d["entityName"]
-                        count = d["metric"]["count"]
-                        amount = d["metric"]["amount"]
-                        top_tran_data.append((state, year, quarter, pincode, count, amount))
-
-insert_query_top_tran = '''INSERT IGNORE INTO top_transaction
-(States, Years, Quarter, Pincodes, Transaction_count, Transaction_amount)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("top_transaction", insert_query_top_tran, top_tran_data)
-
-# ================= 6. TOP USER =================
-base_path = "pulse-main/data/top/user/country/india/state/"
-top_user_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    for d in data["data"]["pincodes"] or []:
-                        pincode = d["name"]
-                        reg_user = d["registeredUsers"]
-                        top_user_data.append((state, year, quarter, pincode, reg_user))
-
-insert_query_top_user = '''INSERT IGNORE INTO top_user
-(States, Years, Quarter, Pincodes, RegisteredUser)
-VALUES (%s, %s, %s, %s, %s)'''
-insert_data("top_user", insert_query_top_user, top_user_data)
-# ================= 7. AGGREGATED INSURANCE =================
-# ================= 7. AGGREGATED INSURANCE =================
-base_path = "pulse-main/data/aggregated/insurance/country/india/state/"
-agg_insur_data = []
-
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    
-                    # Use "transactionData" key instead of "insuranceData"
-                    for d in data.get("data", {}).get("transactionData", []) or []:
-                        ins_type = d.get("name", "Unknown")
-                        count = d["paymentInstruments"][0]["count"] if d.get("paymentInstruments") else 0
-                        amount = d["paymentInstruments"][0]["amount"] if d.get("paymentInstruments") else 0
-                        agg_insur_data.append((state, year, quarter, ins_type, count, amount))
-
-insert_query_agg_insur = '''INSERT IGNORE INTO aggregated_insurance
-(States, Years, Quarter, Insurance_type, Insurance_count, Insurance_amount)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("aggregated_insurance", insert_query_agg_insur, agg_insur_data)
-
-
-# ================= 8. MAP INSURANCE =================
-base_path = "pulse-main/data/map/insurance/hover/country/india/state/"
-map_insur_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    if data["data"] and "hoverDataList" in data["data"]:
-                        for d in data["data"]["hoverDataList"] or []:
-                            district = d.get("name", "Unknown")
-                            count = d["metric"][0]["count"] if d.get("metric") else 0
-                            amount = d["metric"][0]["amount"] if d.get("metric") else 0
-                            map_insur_data.append((state, year, quarter, district, count, amount))
-
-insert_query_map_insur = '''INSERT IGNORE INTO map_insurance
-(States, Years, Quarter, District, Transaction_count, Transaction_amount)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("map_insurance", insert_query_map_insur, map_insur_data)
-
-# ================= 9. TOP INSURANCE =================
-base_path = "pulse-main/data/top/insurance/country/india/state/"
-top_insur_data = []
-for state in os.listdir(base_path):
-    for year in os.listdir(os.path.join(base_path, state)):
-        for file in os.listdir(os.path.join(base_path, state, year)):
-            if file.endswith(".json"):
-                with open(os.path.join(base_path, state, year, file)) as f:
-                    data = json.load(f)
-                    quarter = int(file.strip(".json"))
-                    if data["data"]:
-                        for d in data["data"].get("pincodes", []) or []:
-                            entity_name = d.get("entityName", "Unknown")
-                            count = d["metric"]["count"] if d.get("metric") else 0
-                            amount = d["metric"]["amount"] if d.get("metric") else 0
-                            top_insur_data.append((state, year, quarter, entity_name, count, amount))
-
-insert_query_top_insur = '''INSERT IGNORE INTO top_insurance
-(States, Years, Quarter, Pincodes, Transaction_count, Transaction_amount)
-VALUES (%s, %s, %s, %s, %s, %s)'''
-insert_data("top_insurance", insert_query_top_insur, top_insur_data)
-
-# ================= FINISH =================
-cursor.close()
-db.close()
-print("🎉 All PhonePe Pulse data loaded successfully into MySQL!")
+
+    cursor.close()
+    db.close()
+    print("🎉 All PhonePe Pulse data loaded successfully into MySQL!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from instrument import span
+
+# ================= PARTITIONING =================
+# The fact tables are read and written a quarter at a time: the Home
+# filters and rollup refreshes select by Years/Quarter, and every Pulse
+# release adds one quarter. With --partitioned the loader partitions them
+# by RANGE COLUMNS (Years, Quarter), one partition per quarter plus an
+# empty catch-all, so those queries only open the partitions they need.
+# Every primary key already contains Years and Quarter, as MySQL requires.
+#
+# A changed quarter is rebuilt in a plain staging table and swapped in with
+# EXCHANGE PARTITION. Readers keep seeing the old quarter until the swap,
+# which only holds the table's metadata lock for a moment, and partitions
+# of other quarters are never touched.
+
+CATCH_ALL = "pmax"
+
+
+def partition_name(year, quarter):
+    return f"p{year}q{quarter}"
+
+
+def _period(name):
+    year, quarter = name[1:].split("q")
+    return int(year), int(quarter)
+
+
+def _definition(period):
+    """Partition clause for a (year, quarter), or the catch-all for None."""
+    if period is None:
+        return f"PARTITION {CATCH_ALL} VALUES LESS THAN (MAXVALUE, MAXVALUE)"
+    year, quarter = period
+    return f"PARTITION {partition_name(year, quarter)} VALUES LESS THAN ({year}, {quarter + 1})"
+
+
+def partitioned_periods(cursor, table):
+    """Sorted (year, quarter) partitions of a table, or None if it isn't partitioned."""
+    cursor.execute("SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,))
+    names = [name for (name,) in cursor.fetchall() if name]
+    if not names:
+        return None
+    return sorted(_period(name) for name in names if name != CATCH_ALL)
+
+
+def ensure_partitioned(cursor, table):
+    """Partition `table` per quarter if it isn't yet; returns its (year, quarter) partitions."""
+    periods = partitioned_periods(cursor, table)
+    if periods is not None:
+        return periods
+    cursor.execute(f"SELECT DISTINCT Years, Quarter FROM {table} ORDER BY Years, Quarter")
+    periods = [(year, quarter) for year, quarter in cursor.fetchall()]
+    definitions = ", ".join(_definition(period) for period in periods + [None])
+    with span("loader.partition", table=table, partitions=len(periods)):
+        cursor.execute(f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS (Years, Quarter) ({definitions})")
+    print(f"✅ Partitioned {table} into {len(periods)} quarters")
+    return periods
+
+
+def add_partitions(cursor, table, existing, periods):
+    """Give each of `periods` its own partition; returns the updated partition list.
+
+    A new period is split off the partition whose range currently holds it:
+    the catch-all for a new quarter (which is empty, so the split moves no
+    rows), or the next quarter up when an older one is backfilled.
+    """
+    existing = sorted(existing)
+    for period in sorted(set(periods) - set(existing)):
+        holder = next((p for p in existing if p > period), None)
+        holder_name = CATCH_ALL if holder is None else partition_name(*holder)
+        with span("loader.partition", table=table, partition=partition_name(*period)):
+            cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION {holder_name} "
+                           f"INTO ({_definition(period)}, {_definition(holder)})")
+        existing = sorted(existing + [period])
+    return existing
+
+
+def stage_partition(cursor, table, year, quarter):
+    """Copy one quarter's partition into a fresh unpartitioned staging table.
+
+    Changed files are upserted into the copy, so after the exchange the
+    partition holds the old rows with the new ones applied on top.
+    """
+    name = partition_name(year, quarter)
+    staging = f"{table}_{name}_staging"
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")  # left behind by an interrupted run
+    cursor.execute(f"CREATE TABLE {staging} LIKE {table}")
+    cursor.execute(f"ALTER TABLE {staging} REMOVE PARTITIONING")
+    cursor.execute(f"INSERT INTO {staging} SELECT * FROM {table} PARTITION ({name})")
+    return staging
+
+
+def exchange_partition(cursor, table, year, quarter, staging):
+    """Swap the staging table in as the quarter's partition and drop the old rows."""
+    name = partition_name(year, quarter)
+    with span("loader.exchange", table=table, partition=name):
+        cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {name} WITH TABLE {staging}")
+    drop_staging(cursor, staging)
+
+
+def drop_staging(cursor, staging):
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+# ================= DASHBOARD QUERIES =================
+# Every query app.py issues, by name; views summed from the in-memory cubes
+# live in cube.py, and the data export's queries in export.py, instead.
+# `params` names the bind parameters in order; explain_check.py uses the
+# same names to fill in sample values.
+
+Query = namedtuple("Query", ["sql", "params"])
+
+QUERIES = {
+    # ---- Home ----
+    "periods": Query(
+        "SELECT Years, Quarter FROM rollup_national_quarter ORDER BY Years, Quarter",
+        ()),
+    "leaderboard": Query(
+        """SELECT Position, Entity, Entity_state, Value
+        FROM rollup_leaderboard
+        WHERE Years = %s AND Quarter = %s AND States = %s AND Level = %s AND Metric = %s
+          AND Position <= %s
+        ORDER BY Position""",
+        ("year", "quarter", "state", "level", "metric", "limit")),
+    # District drill-down: one state's districts for a year and quarter range
+    # (1-4 for the whole year), a primary-key range read
+    "district_transaction": Query(
+        """SELECT District, SUM(Transaction_amount) AS Transaction_amount,
+               SUM(Transaction_count) AS Transaction_count
+        FROM map_transaction
+        WHERE States = %s AND Years = %s AND Quarter BETWEEN %s AND %s
+        GROUP BY District""",
+        ("state", "year", "first_quarter", "last_quarter")),
+    "district_user": Query(
+        """SELECT Districts AS District, SUM(RegisteredUser) AS RegisteredUser, SUM(AppOpens) AS AppOpens
+        FROM map_user
+        WHERE States = %s AND Years = %s AND Quarter BETWEEN %s AND %s
+        GROUP BY Districts""",
+        ("state", "year", "first_quarter", "last_quarter")),
+    "district_insurance": Query(
+        """SELECT District, SUM(Transaction_amount) AS Insurance_amount,
+               SUM(Transaction_count) AS Insurance_count
+        FROM map_insurance
+        WHERE States = %s AND Years = %s AND Quarter BETWEEN %s AND %s
+        GROUP BY District""",
+        ("state", "year", "first_quarter", "last_quarter")),
+
+    # ---- Analysis ----
+    "states": Query(
+        "SELECT DISTINCT States FROM rollup_state_year ORDER BY States ASC",
+        ()),
+    "state_growth_ranking": Query(
+        """SELECT States, Transaction_count_yoy, Transaction_amount_yoy, Insurance_amount_yoy,
+               RegisteredUser_yoy, AppOpens_yoy, Opens_per_user
+        FROM derived_metrics
+        WHERE Years = %s AND Quarter = 0 AND Level = 'state'""",
+        ("year",)),
+}
+
+
+def bind(name, **values):
+    """Return (sql, params) for a named query, ordering `values` as it expects."""
+    query = QUERIES[name]
+    return query.sql, tuple(values[p] for p in query.params)
@@ -0,0 +1,275 @@
+from collections import namedtuple
+
+from instrument import span
+
+# ================= ROLLUP TABLES =================
+# Pre-aggregated summaries behind the dashboard's SQL reads: the period and
+# state lists, the leaderboards and the growth ranking (the Home and
+# case-study views are summed from the in-memory cubes instead, cube.py).
+# `select` has a {where} slot that the loader fills with a Years filter so a
+# run only rebuilds the years whose files changed. Rollups are listed in
+# build order: later ones aggregate rollup_state_quarter.
+#
+# Metrics a source does not have are NULL rather than 0, so e.g. years
+# before insurance data existed stay NULL instead of showing zero policies.
+
+Rollup = namedtuple("Rollup", ["table", "create", "select"])
+
+# ---- Leaderboards ----
+# Top LEADERBOARD_SIZE districts and pincodes per (year, quarter, state,
+# metric). Quarter = 0 ranks whole years and States = '' ranks all of
+# India, so every filter combination the dashboard offers is one primary
+# key range. Pincode sources only hold each state's top pincodes per
+# quarter, so pincode ranks are over those.
+LEADERBOARD_SIZE = 10
+
+# (level, metric, fact table, entity column, value column)
+LEADERBOARD_SOURCES = [
+    ("district", "registered_users", "map_user", "Districts", "RegisteredUser"),
+    ("district", "app_opens", "map_user", "Districts", "AppOpens"),
+    ("district", "transaction_count", "map_transaction", "District", "Transaction_count"),
+    ("district", "transaction_amount", "map_transaction", "District", "Transaction_amount"),
+    ("district", "insurance_count", "map_insurance", "District", "Transaction_count"),
+    ("district", "insurance_amount", "map_insurance", "District", "Transaction_amount"),
+    ("pincode", "registered_users", "top_user", "Pincodes", "RegisteredUser"),
+    ("pincode", "transaction_count", "top_transaction", "Pincodes", "Transaction_count"),
+    ("pincode", "transaction_amount", "top_transaction", "Pincodes", "Transaction_amount"),
+    ("pincode", "insurance_count", "top_insurance", "Pincodes", "Transaction_count"),
+    ("pincode", "insurance_amount", "top_insurance", "Pincodes", "Transaction_amount"),
+]
+
+_LEADERBOARD_ENTRIES = "\n            UNION ALL\n".join(
+    f"""            SELECT '{level}' AS Level, '{metric}' AS Metric, States AS Entity_state, Years, Quarter,
+                   CAST({entity} AS CHAR(50)) AS Entity, {value} AS Value
+            FROM {table} {{where}}"""
+    for level, metric, table, entity, value in LEADERBOARD_SOURCES)
+
+# (Quarter, States) of each scope; a district is ranked together with its state
+_LEADERBOARD_SCOPES = [("Quarter", "Entity_state"), ("0", "Entity_state"), ("Quarter", "''"), ("0", "''")]
+
+_LEADERBOARD_TOTALS = "\n        UNION ALL\n".join(
+    f"""        SELECT Years, {quarter} AS Quarter, {state} AS States, Level, Metric, Entity, Entity_state,
+               SUM(Value) AS Value
+        FROM entries
+        GROUP BY Years, {"Quarter, " if quarter == "Quarter" else ""}Entity_state, Level, Metric, Entity"""
+    for quarter, state in _LEADERBOARD_SCOPES)
+
+_STATE_METRICS = '''
+        Transaction_count BIGINT,
+        Transaction_amount DOUBLE,
+        Insurance_count BIGINT,
+        Insurance_amount DOUBLE,
+        RegisteredUser BIGINT,
+        AppOpens BIGINT,'''
+
+_SUM_METRICS = '''SUM(Transaction_count) AS Transaction_count,
+               SUM(Transaction_amount) AS Transaction_amount,
+               SUM(Insurance_count) AS Insurance_count,
+               SUM(Insurance_amount) AS Insurance_amount,
+               SUM(RegisteredUser) AS RegisteredUser,
+               SUM(AppOpens) AS AppOpens'''
+
+ROLLUPS = [
+    Rollup(
+        "rollup_state_quarter",
+        f'''CREATE TABLE IF NOT EXISTS rollup_state_quarter (
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,{_STATE_METRICS}
+        PRIMARY KEY (States, Years, Quarter))''',
+        f'''SELECT States, Years, Quarter,
+               {_SUM_METRICS}
+        FROM (
+            SELECT States, Years, Quarter, Transaction_count, Transaction_amount,
+                   NULL AS Insurance_count, NULL AS Insurance_amount, NULL AS RegisteredUser, NULL AS AppOpens
+            FROM aggregated_transaction {{where}}
+            UNION ALL
+            SELECT States, Years, Quarter, NULL, NULL, Insurance_count, Insurance_amount, NULL, NULL
+            FROM aggregated_insurance {{where}}
+            UNION ALL
+            SELECT States, Years, Quarter, NULL, NULL, NULL, NULL, RegisteredUser, AppOpens
+            FROM map_user {{where}}
+        ) facts
+        GROUP BY States, Years, Quarter'''),
+
+    Rollup(
+        "rollup_state_year",
+        f'''CREATE TABLE IF NOT EXISTS rollup_state_year (
+        States VARCHAR(50),
+        Years INT,{_STATE_METRICS}
+        PRIMARY KEY (States, Years))''',
+        f'''SELECT States, Years,
+               {_SUM_METRICS}
+        FROM rollup_state_quarter {{where}}
+        GROUP BY States, Years'''),
+
+    Rollup(
+        "rollup_national_quarter",
+        f'''CREATE TABLE IF NOT EXISTS rollup_national_quarter (
+        Years INT,
+        Quarter INT,{_STATE_METRICS}
+        PRIMARY KEY (Years, Quarter))''',
+        f'''SELECT Years, Quarter,
+               {_SUM_METRICS}
+        FROM rollup_state_quarter {{where}}
+        GROUP BY Years, Quarter'''),
+
+    Rollup(
+        "rollup_leaderboard",
+        '''CREATE TABLE IF NOT EXISTS rollup_leaderboard (
+        Years INT,
+        Quarter INT,
+        States VARCHAR(50),
+        Level VARCHAR(10),
+        Metric VARCHAR(30),
+        Position INT,
+        Entity VARCHAR(50),
+        Entity_state VARCHAR(50),
+        Value DOUBLE,
+        PRIMARY KEY (Years, Quarter, States, Level, Metric, Position))''',
+        f'''WITH entries AS (
+{_LEADERBOARD_ENTRIES}
+        ),
+        totals AS (
+{_LEADERBOARD_TOTALS}
+        )
+        SELECT Years, Quarter, States, Level, Metric, Position, Entity, Entity_state, Value
+        FROM (
+            SELECT totals.*, ROW_NUMBER() OVER (
+                       PARTITION BY Years, Quarter, States, Level, Metric
+                       ORDER BY Value DESC, Entity) AS Position
+            FROM totals
+        ) ranked
+        WHERE Position <= {LEADERBOARD_SIZE}'''),
+]
+
+
+# Tables earlier versions built that nothing reads any more; the loader drops them
+RETIRED_TABLES = ["rollup_state_year_type", "rollup_state_year_brand"]
+
+
+# ================= DERIVED METRICS =================
+# Growth rates and ratios the Analysis page used to compute in pandas per
+# state, precomputed for every state and for India as a whole so states can
+# be ranked against each other. Level is 'state' or 'national' (States = ''),
+# and Quarter = 0 marks full-year rows. Growth is in percent and NULL when
+# the previous period is missing or zero. Each value depends on its
+# neighbouring periods, so these tables are always rebuilt in full.
+
+_METRIC_COLUMNS = ["Transaction_count", "Transaction_amount", "Insurance_count", "Insurance_amount",
+                   "RegisteredUser", "AppOpens"]
+
+
+def _growth(column, window, period, condition="TRUE"):
+    previous = f"LAG({column}) OVER {window}"
+    return (f"CASE WHEN {condition} AND LAG({period}) OVER {window} = {period} - 1 "
+            f"THEN 100 * ({column} - {previous}) / NULLIF({previous}, 0) END")
+
+
+_GROWTH_COLUMNS = ",\n".join(f"        {c}_yoy DOUBLE,\n        {c}_qoq DOUBLE" for c in _METRIC_COLUMNS)
+
+_GROWTH_SELECT = ",\n".join(
+    f"               {_growth(c, 'yoy', 'Years')} AS {c}_yoy,\n"
+    f"               {_growth(c, 'qoq', 'Years * 4 + Quarter', 'Quarter > 0')} AS {c}_qoq"
+    for c in _METRIC_COLUMNS)
+
+DERIVED = [
+    Rollup(
+        "derived_metrics",
+        f'''CREATE TABLE IF NOT EXISTS derived_metrics (
+        Level VARCHAR(10),
+        States VARCHAR(50),
+        Years INT,
+        Quarter INT,{_STATE_METRICS}
+{_GROWTH_COLUMNS},
+        Opens_per_user DOUBLE,
+        PRIMARY KEY (Level, States, Years, Quarter))''',
+        f'''SELECT Level, States, Years, Quarter, {', '.join(_METRIC_COLUMNS)},
+{_GROWTH_SELECT},
+               AppOpens / NULLIF(RegisteredUser, 0) AS Opens_per_user
+        FROM (
+            SELECT 'state' AS Level, States, Years, Quarter, {', '.join(_METRIC_COLUMNS)}
+            FROM rollup_state_quarter
+            UNION ALL
+            SELECT 'state', States, Years, 0, {', '.join(_METRIC_COLUMNS)}
+            FROM rollup_state_year
+            UNION ALL
+            SELECT 'national', '', Years, Quarter, {', '.join(_METRIC_COLUMNS)}
+            FROM rollup_national_quarter
+            UNION ALL
+            SELECT 'national', '', Years, 0,
+               {_SUM_METRICS}
+            FROM rollup_national_quarter
+            GROUP BY Years
+        ) periods
+        WINDOW yoy AS (PARTITION BY Level, States, Quarter ORDER BY Years),
+               qoq AS (PARTITION BY Level, States, Quarter = 0 ORDER BY Years, Quarter)'''),
+    # each brand's share of a state's (or India's) users per year, from the
+    # summed counts rather than an average of the quarterly percentages, and
+    # its change from the previous year in percentage points
+    Rollup(
+        "derived_device_share",
+        '''CREATE TABLE IF NOT EXISTS derived_device_share (
+        Level VARCHAR(10),
+        States VARCHAR(50),
+        Years INT,
+        Brands VARCHAR(50),
+        Users BIGINT,
+        Share DOUBLE,
+        Share_change DOUBLE,
+        PRIMARY KEY (Level, States, Years, Brands))''',
+        '''SELECT Level, States, Years, Brands, Users, Share,
+               CASE WHEN LAG(Years) OVER brand_years = Years - 1
+                    THEN Share - LAG(Share) OVER brand_years END AS Share_change
+        FROM (
+            SELECT 'state' AS Level, States, Years, Brands, SUM(Transaction_count) AS Users,
+                   100 * SUM(Transaction_count)
+                       / NULLIF(SUM(SUM(Transaction_count)) OVER (PARTITION BY States, Years), 0) AS Share
+            FROM aggregated_user
+            GROUP BY States, Years, Brands
+            UNION ALL
+            SELECT 'national', '', Years, Brands, SUM(Transaction_count),
+                   100 * SUM(Transaction_count) / NULLIF(SUM(SUM(Transaction_count)) OVER (PARTITION BY Years), 0)
+            FROM aggregated_user
+            GROUP BY Years, Brands
+        ) shares
+        WINDOW brand_years AS (PARTITION BY Level, States, Brands ORDER BY Years)'''),
+]
+
+
+def years_filter(years):
+    """WHERE clause limiting a rollup rebuild to `years` (None = every year)."""
+    if years is None:
+        return ""
+    return f"WHERE Years IN ({', '.join(str(int(y)) for y in sorted(years))})"
+
+
+def refresh_rollups(db, cursor, years=None):
+    """Rebuild the rollup rows for `years` (all years when None), then the
+    derived metrics in full, one transaction per table."""
+    changed = years is None or bool(years)
+    # a table built from scratch holds every year, so when no years changed
+    # the tables after it are rebuilt in full rather than for no years at all
+    where = years_filter(years) if years else ""
+    for rollup in ROLLUPS + DERIVED:
+        if _is_empty(cursor, rollup.table):
+            # new table: build it from whatever facts exist
+            changed = _rebuild(db, cursor, rollup, "") > 0 or changed
+        elif changed:
+            _rebuild(db, cursor, rollup, "" if rollup in DERIVED else where)
+
+
+def _is_empty(cursor, table):
+    cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+    return not cursor.fetchall()
+
+
+def _rebuild(db, cursor, rollup, where):
+    with span("loader.rollup", table=rollup.table) as s:
+        cursor.execute(f"DELETE FROM {rollup.table} {where}")
+        cursor.execute(f"INSERT INTO {rollup.table} {rollup.select.format(where=where)}")
+        rows = cursor.rowcount
+        db.commit()
+        s.set(rows=rows)
+    print(f"✅ Refreshed {rollup.table} ({rows} rows)")
+    return rows
@@ -0,0 +1,25 @@
+import pandas as pd
+
+# ================= TYPED FRAMES =================
+# Query results are cached once per process but copied into every session,
+# so they are stored compactly: dimension columns as categoricals (one
+# dictionary of distinct names + small integer codes) and year/quarter
+# as int16/int8.
+
+DIMENSION_COLUMNS = {"States", "Districts", "District", "Transaction_type", "Brands", "Insurance_type", "Pincodes",
+                     "Entity", "Entity_state"}
+COLUMN_DTYPES = {"Years": "int16", "Quarter": "int8"}
+
+
+def compact_frame(df):
+    """Return `df` with categorical dimensions and downcast integer columns."""
+    for column in df.columns:
+        series = df[column]
+        if column in DIMENSION_COLUMNS:
+            df[column] = series.astype("category")
+        elif column in COLUMN_DTYPES and not series.isna().any():
+            df[column] = series.astype(COLUMN_DTYPES[column])
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        # amounts stay float64: float32 cannot hold rupee totals exactly
+    return df
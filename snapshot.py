@@ -0,0 +1,128 @@
+import os
+import time
+import shutil
+
+from rollups import DERIVED, ROLLUPS
+
+# ================= PARQUET SNAPSHOT =================
+# Alternative to MySQL for analytics-only deployments: the loader writes
+# every table as Parquet partitioned by Years/Quarter, and the dashboard
+# queries it in-process with DuckDB through the same named queries.
+# pyarrow (loader) and duckdb (dashboard) are only needed for this backend.
+#
+#   snapshot/<table>/Years=<y>/Quarter=<q>/part-0.parquet
+#   snapshot/VERSION      <- rewritten on every publish
+
+SNAPSHOT_DIR = os.getenv("PULSE_SNAPSHOT_DIR", "snapshot")
+PARTITION_COLUMNS = ["Years", "Quarter"]
+# Columns typed by name: a table's value columns may start with a dimension
+# (Transaction_type, Level/Entity), or be metrics only (national_user)
+_STRING_COLUMNS = {"States", "Transaction_type", "Brands", "District", "Districts", "Pincodes", "Insurance_type",
+                   "Level", "Entity"}
+_FLOAT_COLUMNS = {"Transaction_amount", "Insurance_amount", "Percentage"}
+
+
+def column_type(column):
+    """Arrow type name ("string", "float64" or "int64") of a Pulse column."""
+    if column in _STRING_COLUMNS:
+        return "string"
+    return "float64" if column in _FLOAT_COLUMNS else "int64"
+
+
+def _arrow_type(pa, column):
+    return pa.type_for_alias(column_type(column))
+
+
+class ParquetTableWriter:
+    """Loader writer (same interface as writers.TableWriter) that appends
+    each batch to one open Parquet file per (Years, Quarter) partition."""
+
+    def __init__(self, out_dir, table, key_columns, value_columns):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.table_dir = os.path.join(out_dir, table)
+        self.columns = key_columns + value_columns
+        data_columns = [c for c in self.columns if c not in PARTITION_COLUMNS]
+        self.data_positions = [self.columns.index(c) for c in data_columns]
+        self.schema = pa.schema([(c, _arrow_type(pa, c)) for c in data_columns])
+        self._writers = {}
+        self.rows = 0
+        self.seconds = 0.0
+
+    def write(self, rows):
+        import pyarrow.parquet as pq
+
+        start = time.perf_counter()
+        partitions = {}
+        for row in rows:
+            partitions.setdefault((row[1], row[2]), []).append(row)
+        for (year, quarter), part_rows in partitions.items():
+            writer = self._writers.get((year, quarter))
+            if writer is None:
+                part_dir = os.path.join(self.table_dir, f"Years={year}", f"Quarter={quarter}")
+                os.makedirs(part_dir, exist_ok=True)
+                writer = pq.ParquetWriter(os.path.join(part_dir, "part-0.parquet"), self.schema)
+                self._writers[(year, quarter)] = writer
+            arrays = [self.pa.array([row[i] for row in part_rows], type=field.type)
+                      for i, field in zip(self.data_positions, self.schema)]
+            writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.seconds += time.perf_counter() - start
+        self.rows += len(rows)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def staging_dir(snapshot_dir=SNAPSHOT_DIR):
+    path = f"{snapshot_dir.rstrip(os.sep)}.staging"
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def publish_snapshot(staging, snapshot_dir=SNAPSHOT_DIR):
+    """Swap a fully written staging directory in as the live snapshot."""
+    with open(os.path.join(staging, "VERSION"), "w") as f:
+        f.write(str(time.time()))
+    old = f"{snapshot_dir.rstrip(os.sep)}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(snapshot_dir):
+        os.rename(snapshot_dir, old)
+    os.rename(staging, snapshot_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def snapshot_version(snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(snapshot_dir, "VERSION")) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+# ================= DUCKDB =================
+def connect_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """In-memory DuckDB database exposing every snapshot table, plus the
+    rollup and derived-metric tables as views over them, under their MySQL names."""
+    import duckdb
+
+    conn = duckdb.connect()
+    for table in sorted(os.listdir(snapshot_dir)):
+        table_dir = os.path.join(snapshot_dir, table)
+        if not os.path.isdir(table_dir):
+            continue
+        pattern = os.path.join(table_dir, "**", "*.parquet").replace("'", "''")
+        conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)")
+    for rollup in ROLLUPS + DERIVED:
+        try:
+            conn.execute(f"CREATE VIEW {rollup.table} AS {rollup.select.format(where='')}")
+        except duckdb.Error as e:
+            # a source table is missing from this snapshot
+            print(f"⚠️ Skipping {rollup.table}: {e}")
+    return conn
@@ -0,0 +1,190 @@
+import os
+import time
+import tarfile
+import zipfile
+
+# ================= DATA SOURCES =================
+# Where the loader reads Pulse files from: an extracted pulse-main/data
+# directory, or the upstream repository archive as downloaded (.zip, .tar,
+# .tar.gz, .tgz, .tar.bz2, .tar.xz), read in place without unpacking.
+#
+# walk() yields (state, year, quarter, rel_path, member, size, mtime) for
+# every quarter file of a dataset; `wanted(rel_path, size, mtime)`, if
+# given, says which files will be parsed, for sources that must read a file
+# as they pass it. rel_path is the path under the data directory, the same
+# for every source kind, so the manifest carries over when switching
+# between an extracted tree and its archive. member is what read() needs to
+# fetch the file's bytes; sources are picklable, so parser workers receive
+# one with each task and read the members themselves.
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def open_source(path):
+    """DirectorySource, ZipSource or TarSource for a data directory or archive."""
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    if path.endswith(".zip"):
+        return ZipSource(path)
+    if path.endswith(ARCHIVE_SUFFIXES):
+        return TarSource(path)
+    raise ValueError(f"{path} is not a directory or a {'/'.join(ARCHIVE_SUFFIXES)} archive")
+
+
+def _missing(dataset):
+    print(f"⚠️ Skipping {dataset.table}: {dataset.path} not found")
+
+
+def _quarter_file(parts):
+    """(state, year, quarter) for a <state>/<year>/<quarter>.json path under a
+    dataset, or ('', year, quarter) for a country-level <year>/<quarter>.json;
+    None for anything else."""
+    if len(parts) == 2:
+        parts = [""] + parts
+    if len(parts) != 3 or not parts[2].endswith(".json"):
+        return None
+    state, year, name = parts
+    try:
+        return state, int(year), int(name[:-len(".json")])
+    except ValueError:
+        return None
+
+
+def _dataset_relpath(name, dataset_path):
+    """The part of an archive member name from the dataset directory on, or None.
+
+    Archives wrap the data directory in a top-level folder
+    (pulse-master/data/...), which is skipped wherever it is.
+    """
+    marker = dataset_path + "/"
+    if name.startswith(marker):
+        return name
+    start = name.find("/" + marker)
+    return None if start < 0 else name[start + 1:]
+
+
+class DirectorySource:
+    """An extracted pulse-main/data tree."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def __str__(self):
+        return self.root
+
+    def walk(self, dataset, wanted=None):
+        base_path = os.path.join(self.root, dataset.path)
+        if not os.path.isdir(base_path):
+            _missing(dataset)
+            return
+        # year directories hold a country-level dataset's files; anything
+        # else is a state (a country-level dataset's state/ directory has no
+        # year directories of its own, so it is passed over)
+        year_dirs = [("", year) for year in _subdirs(base_path) if year.isdigit()]
+        for state in _subdirs(base_path):
+            if not state.isdigit():
+                year_dirs.extend((state, year) for year in _subdirs(os.path.join(base_path, state)) if year.isdigit())
+        for state, year in year_dirs:
+            year_path = os.path.join(base_path, state, year)
+            with os.scandir(year_path) as entries:
+                files = sorted((e for e in entries if e.is_file() and e.name.endswith(".json")),
+                               key=lambda e: e.name)
+                for entry in files:
+                    stat = entry.stat()
+                    yield (state, int(year), int(entry.name[:-len(".json")]),
+                           os.path.relpath(entry.path, self.root), entry.path, stat.st_size, stat.st_mtime)
+
+    def read(self, member):
+        with open(member, "rb") as f:
+            return f.read()
+
+
+def _subdirs(path):
+    with os.scandir(path) as entries:
+        return sorted(e.name for e in entries if e.is_dir())
+
+
+# Open zip archives of this process by (pid, path): each parser worker opens
+# the archive once, on first use, and reads every member it is given from it
+_zip_files = {}
+
+
+def _open_zip(path):
+    key = (os.getpid(), path)
+    archive = _zip_files.get(key)
+    if archive is None:
+        archive = _zip_files[key] = zipfile.ZipFile(path)
+    return archive
+
+
+class ZipSource:
+    """The upstream repository zip, read through its central directory.
+
+    Listing a dataset only scans the central directory, with no per-file
+    open or stat; members are read straight from the one open archive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return self.path
+
+    def walk(self, dataset, wanted=None):
+        entries = []
+        for info in _open_zip(self.path).infolist():
+            if info.is_dir():
+                continue
+            rel_path = _dataset_relpath(info.filename, dataset.path)
+            if rel_path is None:
+                continue
+            period = _quarter_file(rel_path[len(dataset.path) + 1:].split("/"))
+            if period is not None:
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+                entries.append(period + (rel_path, info.filename, info.file_size, mtime))
+        if not entries:
+            _missing(dataset)
+        yield from sorted(entries)
+
+    def read(self, member):
+        return _open_zip(self.path).read(member)
+
+
+class TarSource:
+    """The upstream repository tarball, plain or compressed.
+
+    A compressed tarball can only be read front to back, so walk() streams
+    the archive once per dataset and reads each pending member as it passes;
+    the member handed to the parser is then the file's bytes themselves.
+    Members the manifest already has are skipped without being read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return self.path
+
+    def walk(self, dataset, wanted=None):
+        # members that are not wanted come back with member None, unread
+        found = False
+        with tarfile.open(self.path, mode="r|*") as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                rel_path = _dataset_relpath(info.name, dataset.path)
+                if rel_path is None:
+                    continue
+                period = _quarter_file(rel_path[len(dataset.path) + 1:].split("/"))
+                if period is None:
+                    continue
+                found = True
+                member = None
+                if wanted is None or wanted(rel_path, info.size, info.mtime):
+                    member = archive.extractfile(info).read()
+                yield period + (rel_path, member, info.size, info.mtime)
+        if not found:
+            _missing(dataset)
+
+    def read(self, member):
+        return member
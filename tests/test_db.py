@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("mysql.connector.pooling")
+pytest.importorskip("streamlit")
+
+import mysql.connector as mysql_connector  # noqa: E402
+
+import db  # noqa: E402
+from config import DB_CONFIG  # noqa: E402
+
+
+@pytest.fixture
+def pool():
+    try:
+        return db.get_pool()
+    except mysql_connector.Error as e:
+        pytest.skip(f"MySQL is not reachable: {e}")
+
+
+def test_pooled_connection_sees_newly_committed_run(pool):
+    with db.get_connection(pool) as conn:
+        before = db._latest_mysql_run(conn)
+        if before is None:
+            pytest.skip("load_runs does not exist; run loader.py first")
+        loader = mysql_connector.connect(**DB_CONFIG)
+        cursor = loader.cursor()
+        try:
+            cursor.execute("INSERT INTO load_runs (Files_loaded, Rows_loaded) VALUES (0, 0)")
+            run_id = cursor.lastrowid
+            loader.commit()
+            try:
+                # the same pooled connection, read again after another session committed
+                assert db._latest_mysql_run(conn) == run_id
+            finally:
+                cursor.execute("DELETE FROM load_runs WHERE Run_id = %s", (run_id,))
+                loader.commit()
+        finally:
+            cursor.close()
+            loader.close()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from export import write_export  # noqa: E402
+
+
+def test_parquet_schema_survives_null_first_chunk(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "export.parquet")
+    chunks = [[("Goa", None, None)], [("Goa", 12, 3.5), ("Kerala", 7, None)]]
+    rows = write_export(path, "parquet", ["States", "Transaction_count", "Transaction_amount"],
+                        ["string", "int64", "float64"], iter(chunks))
+    table = pq.read_table(path)
+    assert rows == 3
+    assert [str(field.type) for field in table.schema] == ["string", "int64", "double"]
+    assert table.column("Transaction_count").to_pylist() == [None, 12, 7]
+
+
+def test_empty_parquet_export_is_typed(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "export.parquet")
+    assert write_export(path, "parquet", ["States", "Years"], ["string", "int64"], iter([])) == 0
+    assert [str(field.type) for field in pq.read_table(path).schema] == ["string", "int64"]
@@ -0,0 +1,56 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rollups import DERIVED, ROLLUPS, refresh_rollups  # noqa: E402
+
+
+class FakeCursor:
+    """Records statements; `empty` tables answer the emptiness probe with no rows."""
+
+    def __init__(self, empty=()):
+        self.empty = set(empty)
+        self.statements = []
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+        self.rowcount = 5
+        table = sql.split("FROM ", 1)[-1].split()[0]
+        self._rows = [] if sql.startswith("SELECT 1") and table in self.empty else [(1,)]
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeDb:
+    def commit(self):
+        pass
+
+
+def test_no_changed_years_with_an_empty_rollup_rebuilds_the_rest_in_full():
+    cursor = FakeCursor(empty={"rollup_state_quarter"})
+    refresh_rollups(FakeDb(), cursor, years=set())
+
+    assert not any("IN ()" in sql for sql in cursor.statements)
+    deletes = [sql for sql in cursor.statements if sql.startswith("DELETE")]
+    assert deletes == [f"DELETE FROM {rollup.table} " for rollup in ROLLUPS + DERIVED]
+
+
+def test_no_changed_years_and_no_empty_rollup_refreshes_nothing():
+    cursor = FakeCursor()
+    refresh_rollups(FakeDb(), cursor, years=set())
+
+    assert all(sql.startswith("SELECT 1") for sql in cursor.statements)
+
+
+def test_changed_years_refresh_every_rollup_for_those_years():
+    cursor = FakeCursor()
+    refresh_rollups(FakeDb(), cursor, years={2023, 2021})
+
+    deletes = [sql for sql in cursor.statements if sql.startswith("DELETE")]
+    assert len(deletes) == len(ROLLUPS + DERIVED)
+    assert all("WHERE Years IN (2021, 2023)" in sql for sql in deletes[:len(ROLLUPS)])
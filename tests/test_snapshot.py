@@ -0,0 +1,29 @@
+import os
+import sys
+import argparse
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+import loader  # noqa: E402
+from synth_pulse import generate  # noqa: E402
+
+
+def test_snapshot_builds_every_dataset(tmp_path):
+    data_root = str(tmp_path / "data")
+    generate(data_root, states=3, districts=2, pincodes=2, years=2)
+    snapshot_dir = str(tmp_path / "snapshot")
+    args = argparse.Namespace(data_root=data_root, snapshot_dir=snapshot_dir, workers=1,
+                              batch_size=loader.BATCH_SIZE)
+
+    loader.write_snapshot(args)
+
+    for dataset in loader.DATASETS:
+        table = pq.read_table(os.path.join(snapshot_dir, dataset.table))
+        assert table.num_rows > 0, dataset.table
+        for column in ["States", "Years", "Quarter"] + dataset.columns:
+            assert column in table.column_names, (dataset.table, column)
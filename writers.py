@@ -0,0 +1,118 @@
+import os
+import time
+import tempfile
+
+# ================= BULK WRITERS =================
+# The loader hands every writer batches of row tuples for one table. Writers
+# only stage and send rows; committing stays with the loader so the manifest
+# entries for a batch land in the same transaction as its rows.
+
+WRITER_MODES = ["executemany", "multirow", "infile"]
+CHUNK_SIZE = 1000   # rows per multi-row statement / LOAD DATA spool file
+
+
+class TableWriter:
+    def __init__(self, cursor, table, key_columns, value_columns, chunk_size=CHUNK_SIZE, key_size=1):
+        self.cursor = cursor
+        self.table = table
+        self.columns = key_columns + value_columns
+        # a table's primary key is the key columns plus its first `key_size`
+        # value columns (the type, brand, district or pincode; none for totals)
+        self.update_columns = value_columns[key_size:]
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.seconds = 0.0
+
+    def write(self, rows):
+        start = time.perf_counter()
+        for i in range(0, len(rows), self.chunk_size):
+            self._write_chunk(rows[i:i + self.chunk_size])
+        self.seconds += time.perf_counter() - start
+        self.rows += len(rows)
+
+    def _write_chunk(self, rows):
+        raise NotImplementedError
+
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def _upsert_clause(self):
+        return ", ".join(f"{c} = VALUES({c})" for c in self.update_columns)
+
+
+class ExecutemanyWriter(TableWriter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        placeholders = ", ".join(["%s"] * len(self.columns))
+        self.query = f'''INSERT INTO {self.table}
+({", ".join(self.columns)})
+VALUES ({placeholders})
+ON DUPLICATE KEY UPDATE {self._upsert_clause()}'''
+
+    def _write_chunk(self, rows):
+        self.cursor.executemany(self.query, rows)
+
+
+class MultiRowWriter(TableWriter):
+    """One INSERT ... VALUES (...), (...), ... statement per chunk."""
+
+    def _write_chunk(self, rows):
+        row_placeholder = "(" + ", ".join(["%s"] * len(self.columns)) + ")"
+        query = (f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES "
+                 + ", ".join([row_placeholder] * len(rows))
+                 + f" ON DUPLICATE KEY UPDATE {self._upsert_clause()}")
+        self.cursor.execute(query, [value for row in rows for value in row])
+
+
+def _tsv_field(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+class InfileWriter(TableWriter):
+    """Spool each chunk to a TSV file and send it with LOAD DATA LOCAL INFILE.
+
+    REPLACE gives the same last-write-wins result as the upsert writers. The
+    connection must be opened with allow_local_infile=True and the server
+    needs local_infile enabled.
+    """
+
+    def _write_chunk(self, rows):
+        with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8") as spool:
+            for row in rows:
+                spool.write("\t".join(_tsv_field(v) for v in row) + "\n")
+        try:
+            self.cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE {self.table} "
+                "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(self.columns)})",
+                (spool.name,))
+        finally:
+            os.remove(spool.name)
+
+
+_WRITERS = {
+    "executemany": ExecutemanyWriter,
+    "multirow": MultiRowWriter,
+    "infile": InfileWriter,
+}
+
+
+def make_writer(mode, cursor, table, key_columns, value_columns, chunk_size=CHUNK_SIZE, key_size=1):
+    if mode not in _WRITERS:
+        raise ValueError(f"Unknown writer mode {mode!r}, expected one of {WRITER_MODES}")
+    return _WRITERS[mode](cursor, table, key_columns, value_columns, chunk_size=chunk_size, key_size=key_size)
+
+
+# ================= INDEX MAINTENANCE =================
+def disable_keys(cursor, table):
+    # DISABLE KEYS defers non-unique index maintenance on MyISAM/Aria; on
+    # InnoDB the session flags skip unique/foreign key checks during the load.
+    cursor.execute("SET unique_checks = 0, foreign_key_checks = 0")
+    cursor.execute(f"ALTER TABLE {table} DISABLE KEYS")
+
+
+def enable_keys(cursor, table):
+    cursor.execute(f"ALTER TABLE {table} ENABLE KEYS")
+    cursor.execute("SET unique_checks = 1, foreign_key_checks = 1")